@@ -0,0 +1,267 @@
+# Alternative to the pandas loading, cleaning and aggregation in render_spotify_network.py
+# The exports are read straight into an embedded DuckDB database and every step runs as SQL,
+# multi-threaded and spilling to disk when the data does not fit in memory
+# Results come back as Arrow tables
+# Used by render_spotify_network.py when DATA_BACKEND is set to "duckdb"
+# Run this file directly to check that both backends clean the exports in data/ the same way
+
+import os
+import sys
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+# Defaults
+THREADS = 0  # 0 lets DuckDB use one thread per core
+MEMORY_LIMIT = '4GB'  # Beyond this, intermediate results spill to the temporary directory
+TEMP_DIRECTORY = 'out/duckdb_tmp/'
+
+# Types pandas would infer, so both backends read the same values. Dates stay text.
+TYPE_CANDIDATES = ['BOOLEAN', 'BIGINT', 'DOUBLE', 'VARCHAR']
+TEXT_COLUMNS = ['Track Name', 'Artist Name(s)', 'Genres']
+REQUIRED_COLUMNS = ['Spotify ID', 'Genres', 'Track Name', 'Artist Name(s)', 'user']
+
+def quote(value):
+    return "'" + value.replace("'", "''") + "'"
+
+def connect(threads=THREADS, memory_limit=MEMORY_LIMIT, temp_directory=TEMP_DIRECTORY):
+    config = {'memory_limit': memory_limit, 'temp_directory': temp_directory}
+    if threads:
+        config['threads'] = threads
+    return duckdb.connect(config=config)
+
+def load_exports(connection, paths):
+    # One table holding every export in the order given, plus the user from each filename.
+    # Its rowid keeps that order for every later step.
+    text_types = ', '.join(f'{quote(column)}: \'VARCHAR\'' for column in TEXT_COLUMNS)
+    connection.execute(f'''
+        CREATE OR REPLACE TEMP TABLE exports AS
+        SELECT * EXCLUDE (filename), split_part(parse_filename(filename), '_', 1) AS "user"
+        FROM read_csv(?, filename = true, union_by_name = true,
+                      auto_type_candidates = {TYPE_CANDIDATES}, types = {{{text_types}}})
+    ''', [paths])
+
+def enrich_missing_genres(connection, enrich):
+    # Fill in the genres of tracks exported without any from their artists' genres.
+    # enrich takes a list of artist ids and returns {artist_id: [genre, ...]}.
+    if 'Artist IDs' not in connection.table('exports').columns:
+        return
+    missing = '"Genres" IS NULL AND "Artist IDs" IS NOT NULL'
+    artist_ids = connection.sql(f'''
+        SELECT DISTINCT unnest(string_split("Artist IDs", ',')) FROM exports WHERE {missing}
+    ''').fetchnumpy()
+    artist_ids = next(iter(artist_ids.values())).tolist()
+    if not artist_ids:
+        return
+
+    artist_genres = enrich(artist_ids)
+    rows = [(artist_id, position, genre)
+            for artist_id in artist_ids
+            for position, genre in enumerate(artist_genres.get(artist_id, []))]
+    genres = pd.DataFrame(rows, columns=['artist_id', 'position', 'genre'])
+    connection.register('artist_genres', genres)
+
+    # Genres in the order of the artists, each kept at its first appearance
+    connection.execute(f'''
+        CREATE OR REPLACE TEMP TABLE enriched AS
+        WITH artists AS (
+            SELECT rowid AS row, unnest(ids) AS artist_id, unnest(range(len(ids))) AS artist_position
+            FROM (SELECT rowid, string_split("Artist IDs", ',') AS ids FROM exports WHERE {missing})
+        ), firsts AS (
+            SELECT row, genre, min([artist_position, position]) AS first
+            FROM artists JOIN artist_genres USING (artist_id)
+            GROUP BY row, genre
+        )
+        SELECT row, string_agg(genre, ',' ORDER BY first) AS genres FROM firsts GROUP BY row
+    ''')
+    connection.execute('UPDATE exports SET "Genres" = enriched.genres FROM enriched WHERE exports.rowid = enriched.row')
+    connection.unregister('artist_genres')
+
+def clean(connection, resolve_genres, unknown_weight, share_prefix):
+    # Same steps as clean_rows and combine_cleaned in render_spotify_network.py.
+    # resolve_genres takes a list of genres and returns their categories.
+    present = ' AND '.join(f'"{column}" IS NOT NULL' for column in REQUIRED_COLUMNS)
+    stripped = ', '.join(
+        f'''regexp_replace("{column}", '[^\\x00-\\x7F]+', '', 'g') AS "{column}"'''
+        for column in TEXT_COLUMNS + ['user']
+    )
+    connection.execute(f'''
+        CREATE OR REPLACE TEMP TABLE stripped AS
+        SELECT * REPLACE ({stripped}), row_number() OVER (ORDER BY rowid) - 1 AS row
+        FROM exports WHERE {present}
+    ''')
+
+    # Explode the genre lists, keeping the position of each genre in its list
+    connection.execute('''
+        CREATE OR REPLACE TEMP TABLE voting_genres AS
+        SELECT row, unnest(genres) AS genre, unnest(range(1, len(genres) + 1)) AS position
+        FROM (
+            SELECT row, list_filter(list_transform(string_split("Genres", ','), lambda g: trim(g)),
+                                    lambda g: g <> '') AS genres
+            FROM stripped
+        )
+    ''')
+
+    # Resolve each distinct genre once, outside the database
+    distinct = connection.sql('SELECT DISTINCT genre FROM voting_genres').fetchnumpy()['genre'].tolist()
+    connection.register('genre_categories', pd.DataFrame({'genre': distinct, 'category': resolve_genres(distinct)}))
+
+    # Vote for categories with weights decaying by position in the genre list
+    connection.execute(f'''
+        CREATE OR REPLACE TEMP TABLE votes AS
+        SELECT row, category, weight / sum(weight) OVER (PARTITION BY row) AS share
+        FROM (
+            SELECT row, category,
+                   sum(1.0 / position * CASE WHEN category = 'Unknown' THEN {float(unknown_weight)!r} ELSE 1.0 END)
+                       AS weight
+            FROM voting_genres JOIN genre_categories USING (genre)
+            GROUP BY row, category
+        )
+    ''')
+    connection.unregister('genre_categories')
+
+    # One share column per category, the winner breaking ties by name like idxmax does
+    shares = connection.sql(f'''
+        PIVOT (SELECT row, {quote(share_prefix)} || category AS category, share FROM votes)
+        ON category USING first(share) GROUP BY row
+    ''')
+    share_columns = sorted(column for column in shares.columns if column != 'row')
+    filled = ''.join(f', coalesce(shares."{column}", 0.0) AS "{column}"' for column in share_columns)
+    connection.execute(f'''
+        CREATE OR REPLACE TEMP TABLE cleaned AS
+        WITH shares AS ({shares.sql_query()}),
+        winners AS (SELECT row, first(category ORDER BY share DESC, category) AS category FROM votes GROUP BY row)
+        SELECT stripped.*,
+               split_part(split_part("Genres", ', ', 1), ',', 1) AS "Primary Genre",
+               coalesce(winners.category, 'Unknown') AS "Category"{filled}
+        FROM stripped LEFT JOIN winners USING (row) LEFT JOIN shares USING (row)
+        ORDER BY row
+    ''')
+
+    return resolve_duplicate_tracks(connection)
+
+def resolve_duplicate_tracks(connection):
+    # Give every Spotify ID of a song the first ID seen for its normalized name and artists,
+    # returning the IDs that were replaced
+    connection.execute('''
+        CREATE OR REPLACE TEMP TABLE id_map AS
+        WITH keyed AS (
+            SELECT row, "Spotify ID",
+                   lower(trim(regexp_replace("Track Name", '\\s+', ' ', 'g'))) AS name_key,
+                   lower(trim(regexp_replace("Artist Name(s)", '\\s+', ' ', 'g'))) AS artist_key
+            FROM cleaned
+        ), canonical AS (
+            SELECT name_key, artist_key, arg_min("Spotify ID", row) AS canonical
+            FROM keyed GROUP BY name_key, artist_key
+        )
+        SELECT "Spotify ID", arg_min(canonical, row) AS "Canonical ID"
+        FROM keyed JOIN canonical USING (name_key, artist_key)
+        GROUP BY "Spotify ID"
+        HAVING "Spotify ID" <> "Canonical ID"
+        ORDER BY min(row)
+    ''')
+    connection.execute('''
+        UPDATE cleaned SET "Spotify ID" = id_map."Canonical ID"
+        FROM id_map WHERE cleaned."Spotify ID" = id_map."Spotify ID"
+    ''')
+    return connection.sql('SELECT * FROM id_map').to_arrow_table()
+
+def aggregate(connection):
+    # The tables create_nodes_and_edges builds from: the first row of each track,
+    # every (row, genre) pair, and each user's genres with their track counts, in order of first appearance
+    connection.execute('''
+        CREATE OR REPLACE TEMP TABLE track_genres AS
+        SELECT row AS "Row", genre AS "Genre", row_number() OVER (ORDER BY row, position) AS ordinal
+        FROM (
+            SELECT row, unnest(genres) AS genre, unnest(range(len(genres))) AS position
+            FROM (SELECT row, list_filter(string_split("Genres", ','), lambda g: g <> '') AS genres FROM cleaned)
+        )
+    ''')
+    return {
+        'tracks': connection.sql('''
+            SELECT * EXCLUDE (row) FROM cleaned
+            QUALIFY row_number() OVER (PARTITION BY "Spotify ID" ORDER BY row) = 1
+            ORDER BY row
+        ''').to_arrow_table(),
+        'track_genres': connection.sql('SELECT "Row", "Genre" FROM track_genres ORDER BY ordinal').to_arrow_table(),
+        'user_genres': connection.sql('''
+            SELECT cleaned."user", "Genre", count(*) AS "Tracks"
+            FROM track_genres JOIN cleaned ON track_genres."Row" = cleaned.row
+            GROUP BY cleaned."user", "Genre" ORDER BY min(ordinal)
+        ''').to_arrow_table(),
+    }
+
+def load_and_clean(paths, resolve_genres, unknown_weight, share_prefix, enrich=None,
+                   threads=THREADS, memory_limit=MEMORY_LIMIT, temp_directory=TEMP_DIRECTORY):
+    # Returns the cleaned rows, the replaced Spotify IDs and the aggregated tables, all as Arrow
+    connection = connect(threads, memory_limit, temp_directory)
+    try:
+        load_exports(connection, paths)
+        if enrich is not None:
+            enrich_missing_genres(connection, enrich)
+        id_map = clean(connection, resolve_genres, unknown_weight, share_prefix)
+        tables = aggregate(connection)
+        cleaned = connection.sql('SELECT * EXCLUDE (row) FROM cleaned ORDER BY row').to_arrow_table()
+    finally:
+        connection.close()
+    return cleaned, id_map, tables
+
+def frames_match(expected, actual):
+    # Same columns in the same order and the same values, with shares compared approximately
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)
+    if list(expected.columns) != list(actual.columns) or len(expected) != len(actual):
+        return False
+    for column in expected.columns:
+        first, second = expected[column], actual[column]
+        if pd.api.types.is_float_dtype(first):
+            if not np.allclose(first.to_numpy(), second.to_numpy(dtype=np.float64), rtol=1e-9, equal_nan=True):
+                return False
+        elif not (first.isna().to_numpy() == second.isna().to_numpy()).all() or \
+                not (first[first.notna()].astype(str).to_numpy() == second[second.notna()].astype(str).to_numpy()).all():
+            return False
+    return True
+
+def check_parity(temp_directory=TEMP_DIRECTORY):
+    # Run both backends over data/ and compare everything create_nodes_and_edges is
+    # given, and the nodes and edges it builds from that
+    import render_spotify_network as render
+    render.VERBOSE = False
+
+    start = time.perf_counter()
+    expected = render.clean_data(render.load_data_from_csv())
+    expected_tables = render.aggregate_tables(expected)
+    pandas_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaned, _, tables = load_and_clean(
+        [render.DATA_PATH + filename for filename in os.listdir(render.DATA_PATH)],
+        render.resolve_genres, render.UNKNOWN_GENRE_WEIGHT, render.SHARE_PREFIX,
+        temp_directory=temp_directory,
+    )
+    duckdb_time = time.perf_counter() - start
+
+    print(f'\npandas: {pandas_time:.2f}s, duckdb: {duckdb_time:.2f}s for {len(expected)} rows')
+    cleaned = cleaned.to_pandas()
+    tables = {name: table.to_pandas() for name, table in tables.items()}
+    results = {'cleaned': frames_match(expected, cleaned)}
+    for name, table in tables.items():
+        results[name] = frames_match(expected_tables[name], table)
+
+    expected_graph = render.create_nodes_and_edges(expected, expected_tables)
+    graph = render.create_nodes_and_edges(cleaned, tables)
+    for name, expected_table, table in zip(['nodes', 'edges'], expected_graph, graph):
+        results[name] = frames_match(expected_table.to_frame(), table.to_frame())
+
+    for name, matched in results.items():
+        print(f'{name:<14}{"match" if matched else "MISMATCH"}')
+    return all(results.values())
+
+def main():
+    if not check_parity():
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
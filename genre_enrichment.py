@@ -0,0 +1,178 @@
+# This script is designed to be used with my spotify network visualization
+# It looks up genres for the artists of tracks that were exported without any, so those tracks are not dropped
+# Lookups go through a client in batches and are cached on disk, so each artist is only looked up once
+# Run this file directly to try the client against a local mock server
+
+import json
+import os
+import time
+import random
+import threading
+import http.client
+import http.server
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Paths
+CACHE_PATH = 'artist_genres.json'
+
+# Client settings
+API_URL = 'https://api.spotify.com/v1'
+TOKEN_VARIABLE = 'SPOTIFY_TOKEN'  # Environment variable holding an API access token
+BATCH_SIZE = 50  # Artists per request, the most the Spotify API accepts
+CONCURRENCY = 4  # Requests in flight at once
+MAX_RETRIES = 5  # Retries per batch after rate limiting or server errors
+BACKOFF = 0.5  # Seconds to wait before the first retry, doubled for each further retry
+TIMEOUT = 10  # Seconds before a request is abandoned
+
+class ArtistGenreClient:
+    # Spotify Web API client for GET /artists?ids=..., keeping one connection
+    # alive per worker thread. Any object with a fetch(artist_ids) method that
+    # returns {artist_id: [genre, ...]} can be used in its place.
+    def __init__(self, api_url=API_URL, token=None, timeout=TIMEOUT):
+        self.url = urllib.parse.urlsplit(api_url)
+        self.token = token if token is not None else os.environ.get(TOKEN_VARIABLE)
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        if getattr(self.local, 'connection', None) is None:
+            kind = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+            self.local.connection = kind(self.url.netloc, timeout=self.timeout)
+        return self.local.connection
+
+    def reset(self):
+        if getattr(self.local, 'connection', None) is not None:
+            self.local.connection.close()
+            self.local.connection = None
+
+    def fetch(self, artist_ids):
+        path = self.url.path.rstrip('/') + '/artists?' + urllib.parse.urlencode({'ids': ','.join(artist_ids)})
+        headers = {'Authorization': 'Bearer ' + self.token} if self.token else {}
+
+        for attempt in range(MAX_RETRIES + 1):
+            wait = BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+            try:
+                connection = self.connection()
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                # The kept-alive connection may have been dropped, so start a new one
+                self.reset()
+            else:
+                if response.status == 200:
+                    artists = json.loads(body)['artists']
+                    return {artist['id']: artist.get('genres', []) for artist in artists if artist}
+                if response.status != 429 and response.status < 500:
+                    raise RuntimeError(f'Artist lookup failed with HTTP {response.status}: {body[:200]!r}')
+                # Rate limited or server error, honoring Retry-After when given
+                if response.getheader('Retry-After'):
+                    wait = float(response.getheader('Retry-After'))
+            if attempt < MAX_RETRIES:
+                time.sleep(wait)
+        raise RuntimeError(f'Artist lookup failed after {MAX_RETRIES} retries')
+
+class GenreCache:
+    # Artist id -> genres, persisted as JSON. Artists without genres are stored
+    # with an empty list so they are not looked up again either.
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.genres = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.genres = json.load(f)
+
+    def missing(self, artist_ids):
+        with self.lock:
+            return [artist_id for artist_id in dict.fromkeys(artist_ids) if artist_id not in self.genres]
+
+    def update(self, results):
+        with self.lock:
+            self.genres.update(results)
+
+    def save(self):
+        # Write to a temporary file first so an interrupted save keeps the old cache
+        with self.lock:
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(self.genres, f)
+            os.replace(self.path + '.tmp', self.path)
+
+def enrich(artist_ids, client=None, cache=None):
+    # Genres for each artist id, looking up the ones the cache does not have yet
+    client = client or ArtistGenreClient()
+    cache = cache or GenreCache()
+    missing = cache.missing(artist_ids)
+    batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+
+    try:
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            futures = {executor.submit(client.fetch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                results = future.result()
+                # Artists the service did not return still count as looked up
+                cache.update({artist_id: results.get(artist_id, []) for artist_id in futures[future]})
+    finally:
+        # Keep whatever was resolved, even if a batch failed
+        if batches:
+            cache.save()
+
+    return {artist_id: cache.genres.get(artist_id, []) for artist_id in artist_ids}
+
+class MockArtistHandler(http.server.BaseHTTPRequestHandler):
+    # Stand-in for the artists endpoint that makes up genres from each id and
+    # rate limits every RATE_LIMIT_EVERY-th request, for trying the client offline
+    RATE_LIMIT_EVERY = 3
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        with self.lock:
+            MockArtistHandler.requests += 1
+            limited = MockArtistHandler.requests % self.RATE_LIMIT_EVERY == 0
+        if limited:
+            self.send_response(429)
+            self.send_header('Retry-After', '0.1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        ids = urllib.parse.parse_qs(url.query).get('ids', [''])[0].split(',')
+        artists = [{'id': artist_id, 'genres': ['mock ' + artist_id[-1:]] if artist_id[-1:].isdigit() else []}
+                   for artist_id in ids]
+        body = json.dumps({'artists': artists}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_server(port=0):
+    # Serve the mock endpoint in a background thread, returning the server and its API URL
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), MockArtistHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+def main():
+    server, api_url = start_mock_server()
+    cache = GenreCache('out/artist_genres_mock.json')
+    artist_ids = [f'artist{i}' for i in range(230)] + ['artistx']
+
+    start = time.perf_counter()
+    genres = enrich(artist_ids, ArtistGenreClient(api_url), cache)
+    print(f'Looked up {len(genres)} artists in {time.perf_counter() - start:.2f}s '
+          f'({MockArtistHandler.requests} requests, some rate limited)')
+    print('artist7:', genres['artist7'], 'artistx:', genres['artistx'])
+
+    requests = MockArtistHandler.requests
+    enrich(artist_ids, ArtistGenreClient(api_url), cache)
+    print(f'Second run made {MockArtistHandler.requests - requests} requests')
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
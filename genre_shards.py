@@ -0,0 +1,45 @@
+# Shared memory string columns and the worker that splits their genre lists
+# Used by render_spotify_network.py to explode genres over BUILD_PROCESSES workers.
+# Kept apart from that script, which prints its banner and opens the genre store
+# when imported, so workers started with "spawn" only import this small module.
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+def share_strings(values):
+    # Copy a string column into shared memory in the Arrow layout: an int64
+    # offsets array followed by one UTF-8 buffer. Workers attach to it by name.
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    memory = shared_memory.SharedMemory(
+        create=True, size=max(offsets.nbytes + int(offsets[-1]), 1)
+    )
+    memory.buf[: offsets.nbytes] = offsets.tobytes()
+    memory.buf[offsets.nbytes : offsets.nbytes + int(offsets[-1])] = b"".join(encoded)
+    return memory
+
+
+def split_genre_shard(memory_name, count, rows):
+    # Worker side of explode_genres: split the genre lists of some rows of a
+    # shared string column. Genres come back factorized to keep results small.
+    memory = shared_memory.SharedMemory(name=memory_name)
+    try:
+        offsets = np.frombuffer(memory.buf, dtype=np.int64, count=count + 1).tolist()
+        buffer = memory.buf[(count + 1) * 8 :]
+        pair_rows = []
+        genres = []
+        for row in rows.tolist():
+            text = bytes(buffer[offsets[row] : offsets[row + 1]]).decode("utf-8")
+            for genre in text.split(","):
+                if genre != "":
+                    pair_rows.append(row)
+                    genres.append(genre)
+        buffer.release()
+    finally:
+        memory.close()
+    codes, uniques = pd.factorize(pd.Series(genres, dtype=object))
+    return np.array(pair_rows, dtype=np.int64), codes, uniques.to_numpy()
@@ -0,0 +1,69 @@
+// Applies a graph delta written by render_spotify_network.py (network_delta.json)
+// to the live vis DataSets, so a page can pick up a rebuild without reloading.
+// Existing nodes keep their current positions.
+
+function applyGraphDelta(delta, loadedOnly) {
+  nodes.remove(delta.nodes.remove);
+  edges.remove(delta.edges.remove);
+
+  var added = delta.nodes.add;
+  var updated = delta.nodes.update;
+  var changedEdges = delta.edges.add.concat(delta.edges.update);
+  if (loadedOnly) {
+    // a seed page leaves tracks to the subgraph queries, so only follow the
+    // nodes it already holds and any new users, genres and categories
+    var loaded = nodes.get({ returnType: "Object" });
+    added = added.filter(function (node) {
+      return node.type !== "track";
+    });
+    updated = updated.filter(function (node) {
+      return node.id in loaded;
+    });
+    var present = new Set(Object.keys(loaded));
+    added.forEach(function (node) {
+      present.add(node.id);
+    });
+    changedEdges = changedEdges.filter(function (edge) {
+      return present.has(edge.from) && present.has(edge.to);
+    });
+  }
+
+  // strip positions from updates so nodes stay where physics or the user put them
+  var updates = updated.map(function (node) {
+    var copy = Object.assign({}, node);
+    delete copy.x;
+    delete copy.y;
+    return copy;
+  });
+  nodes.update(added.concat(updates));
+  edges.update(changedEdges);
+
+  // keep the highlight helpers in utils.js in sync
+  for (let i = 0; i < delta.nodes.remove.length; i++) {
+    delete nodeColors[delta.nodes.remove[i]];
+  }
+  var changed = added.concat(updated);
+  for (let i = 0; i < changed.length; i++) {
+    nodeColors[changed[i].id] = changed[i].color;
+  }
+  allNodes = nodes.get({ returnType: "Object" });
+  allEdges = edges.get({ returnType: "Object" });
+}
+
+function fetchGraphDelta(url) {
+  // only works when the page is served over http, not opened from disk
+  return fetch(url || "network_delta.json")
+    .then(function (response) {
+      return response.json();
+    })
+    .then(applyGraphDelta);
+}
+
+function listenForGraphDeltas(url, loadedOnly) {
+  // deltas pushed by render_spotify_network.py --serve
+  var source = new EventSource(url);
+  source.addEventListener("delta", function (event) {
+    applyGraphDelta(JSON.parse(event.data), loadedOnly);
+  });
+  return source;
+}
@@ -0,0 +1,48 @@
+// Loads parts of the graph on demand from the query endpoints served by
+// render_spotify_network.py --serve, e.g. "/ego/<node>?depth=2",
+// "/user/<name>", "/genre/<name>" or "/category/<name>".
+
+function loadSubgraph(path, replace) {
+  return fetch(path)
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.status + " " + response.statusText);
+      }
+      return response.json();
+    })
+    .then(function (subgraph) {
+      if (replace) {
+        nodes.clear();
+        edges.clear();
+      }
+      nodes.update(subgraph.nodes);
+      edges.update(subgraph.edges);
+
+      // keep the highlight helpers in utils.js aware of the new nodes
+      for (let i = 0; i < subgraph.nodes.length; i++) {
+        nodeColors[subgraph.nodes[i].id] = subgraph.nodes[i].color;
+      }
+      allNodes = nodes.get({ returnType: "Object" });
+      return subgraph;
+    });
+}
+
+function initSubgraphExpansion(depth) {
+  // the served page opens with users, genres and categories only: select one
+  // to pull in its tracks from its own route, e.g. "/user/<name>"
+  network.on("selectNode", function (params) {
+    var node = nodes.get(params.nodes[0]);
+    if (node && node.type !== "track") {
+      loadSubgraph("/" + node.type + "/" + encodeURIComponent(node.id), false);
+    }
+  });
+
+  // double-click a node to pull in its neighbours
+  network.on("doubleClick", function (params) {
+    if (params.nodes.length === 0) {
+      return;
+    }
+    var node = encodeURIComponent(params.nodes[0]);
+    loadSubgraph("/ego/" + node + "?depth=" + (depth || 1), false);
+  });
+}
@@ -0,0 +1,71 @@
+// Progressive loading of track nodes by viewport tile.
+// Tiles are quadtree cells written by render_spotify_network.py as
+// tile_<key>.js scripts that call tileLoaded() with their nodes and edges.
+// The index lists each tile's key and its [minX, minY, maxX, maxY] bounds.
+var tileIndex = null;
+var requestedTiles = {};
+var tileTimer = null;
+
+function initTileLoading(index) {
+  tileIndex = index;
+
+  network.on("zoom", scheduleTileLoad);
+  network.on("dragEnd", scheduleTileLoad);
+  network.once("afterDrawing", loadVisibleTiles);
+}
+
+function scheduleTileLoad() {
+  // debounce so a zoom gesture only triggers one pass
+  if (tileTimer !== null) {
+    clearTimeout(tileTimer);
+  }
+  tileTimer = setTimeout(loadVisibleTiles, 150);
+}
+
+function loadVisibleTiles() {
+  tileTimer = null;
+  var scale = network.getScale();
+  if (scale < tileIndex.minScale) {
+    return;
+  }
+
+  // visible area in canvas coordinates
+  var container = document.getElementById("mynetwork");
+  var center = network.getViewPosition();
+  var halfWidth = container.clientWidth / 2 / scale;
+  var halfHeight = container.clientHeight / 2 / scale;
+
+  var minX = center.x - halfWidth;
+  var maxX = center.x + halfWidth;
+  var minY = center.y - halfHeight;
+  var maxY = center.y + halfHeight;
+
+  for (let i = 0; i < tileIndex.tiles.length; i++) {
+    var bounds = tileIndex.tiles[i].bounds;
+    if (bounds[0] <= maxX && bounds[2] >= minX && bounds[1] <= maxY && bounds[3] >= minY) {
+      requestTile(tileIndex.tiles[i].key);
+    }
+  }
+}
+
+function requestTile(key) {
+  if (requestedTiles[key]) {
+    return;
+  }
+  requestedTiles[key] = true;
+
+  var script = document.createElement("script");
+  script.src = tileIndex.path + "tile_" + key + ".js";
+  document.head.appendChild(script);
+}
+
+function tileLoaded(key, tile) {
+  nodes.update(tile.nodes);
+  edges.update(tile.edges);
+
+  // keep the highlight helpers in utils.js aware of the new nodes
+  for (let i = 0; i < tile.nodes.length; i++) {
+    nodeColors[tile.nodes[i].id] = tile.nodes[i].color;
+  }
+  allNodes = nodes.get({ returnType: "Object" });
+}
@@ -0,0 +1,103 @@
+// Plays back the timeline written by render_spotify_network.py (timeline.js).
+// Each frame holds the nodes and edges that first appeared in one period, with
+// fixed positions, so stepping through frames never restarts physics.
+var timeline = null;
+var timelineFrame = -1;
+var timelineTimer = null;
+
+function loadTimeline(src) {
+  var script = document.createElement("script");
+  script.src = src;
+  document.head.appendChild(script);
+}
+
+function timelineLoaded(data) {
+  timeline = data;
+  network.setOptions({ physics: false });
+  nodes.clear();
+  edges.clear();
+  timelineFrame = -1;
+  addTimelineControls();
+  showTimelineFrame(timeline.frames.length - 1);
+}
+
+function showTimelineFrame(index) {
+  // moving forward adds the frames in between, moving back removes them
+  if (index > timelineFrame) {
+    for (let i = timelineFrame + 1; i <= index; i++) {
+      nodes.add(timeline.frames[i].nodes);
+      edges.add(timeline.frames[i].edges);
+    }
+  } else {
+    for (let i = timelineFrame; i > index; i--) {
+      edges.remove(timeline.frames[i].edges.map(function (edge) { return edge.id; }));
+      nodes.remove(timeline.frames[i].nodes.map(function (node) { return node.id; }));
+    }
+  }
+  timelineFrame = index;
+
+  // keep the highlight helpers in utils.js in sync
+  allNodes = nodes.get({ returnType: "Object" });
+  for (let id in allNodes) {
+    nodeColors[id] = allNodes[id].color;
+  }
+
+  document.getElementById("timeline-slider").value = index;
+  document.getElementById("timeline-label").textContent = timeline.periods[index];
+}
+
+function playTimeline(interval) {
+  stopTimeline();
+  if (timelineFrame >= timeline.frames.length - 1) {
+    showTimelineFrame(0);
+  }
+  timelineTimer = setInterval(function () {
+    if (timelineFrame >= timeline.frames.length - 1) {
+      stopTimeline();
+    } else {
+      showTimelineFrame(timelineFrame + 1);
+    }
+  }, interval || 500);
+}
+
+function stopTimeline() {
+  if (timelineTimer !== null) {
+    clearInterval(timelineTimer);
+    timelineTimer = null;
+  }
+}
+
+function addTimelineControls() {
+  var controls = document.createElement("div");
+  controls.style.cssText =
+    "position:fixed;bottom:16px;left:16px;padding:8px;background:#181825;color:#cdd6f4;font-family:sans-serif";
+
+  var button = document.createElement("button");
+  button.textContent = "Play";
+  button.onclick = function () {
+    if (timelineTimer === null) {
+      playTimeline();
+    } else {
+      stopTimeline();
+    }
+  };
+
+  var slider = document.createElement("input");
+  slider.id = "timeline-slider";
+  slider.type = "range";
+  slider.min = 0;
+  slider.max = timeline.frames.length - 1;
+  slider.oninput = function () {
+    stopTimeline();
+    showTimelineFrame(parseInt(slider.value));
+  };
+
+  var label = document.createElement("span");
+  label.id = "timeline-label";
+  label.style.marginLeft = "8px";
+
+  controls.appendChild(button);
+  controls.appendChild(slider);
+  controls.appendChild(label);
+  document.body.appendChild(controls);
+}
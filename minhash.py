@@ -0,0 +1,173 @@
+# MinHash signatures and locality-sensitive hashing for approximate set overlap
+# Used by render_spotify_network.py when there are too many users to compare every pair exactly
+# Run this file directly to benchmark the approximation against the exact computation
+
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Defaults
+SIGNATURE_SIZE = 128  # Number of hash functions per signature
+BANDS = 64  # Number of LSH bands, each covering SIGNATURE_SIZE / BANDS rows
+SEED = 42
+CHUNK_SIZE = 65536  # Values hashed, or pairs compared, at once
+
+EMPTY = np.iinfo(np.uint64).max
+
+def mix64(x):
+    # splitmix64 finalizer, relying on numpy's wrapping uint64 arithmetic
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def hash_seeds(size=SIGNATURE_SIZE, seed=SEED):
+    return np.random.default_rng(seed).integers(0, EMPTY, size=size, dtype=np.uint64, endpoint=True)
+
+def signature(values, seeds):
+    # Minimum of each seeded hash over the set; an empty set gets an all-EMPTY signature
+    hashes = pd.util.hash_array(pd.unique(np.asarray(values, dtype=object)))
+    result = np.full(len(seeds), EMPTY, dtype=np.uint64)
+    for start in range(0, len(hashes), CHUNK_SIZE):
+        chunk = hashes[start:start + CHUNK_SIZE]
+        result = np.minimum(result, mix64(chunk[:, None] ^ seeds[None, :]).min(axis=0))
+    return result
+
+def merge(first, second):
+    # The signature of a union is the elementwise minimum of the signatures
+    return np.minimum(first, second)
+
+def estimate(first, second):
+    # Fraction of agreeing rows estimates the Jaccard similarity
+    if first[0] == EMPTY and second[0] == EMPTY:
+        return 0.0
+    return float(np.mean(first == second))
+
+def estimate_pairs(signatures, first, second):
+    # estimate() over arrays of row indices, a chunk of pairs at a time
+    signatures = np.asarray(signatures)
+    result = np.zeros(len(first), dtype=np.float64)
+    for start in range(0, len(first), CHUNK_SIZE):
+        a = signatures[first[start:start + CHUNK_SIZE]]
+        b = signatures[second[start:start + CHUNK_SIZE]]
+        agree = (a == b).mean(axis=1)
+        result[start:start + CHUNK_SIZE] = np.where((a[:, 0] == EMPTY) & (b[:, 0] == EMPTY), 0.0, agree)
+    return result
+
+def candidate_pairs(signatures, bands=BANDS):
+    # Row indices (first, second), first < second, of the signatures that agree on
+    # at least one whole band, sorted and without repeats
+    signatures = np.asarray(signatures)
+    count = len(signatures)
+    rows = signatures.shape[1] // bands
+    codes = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, buckets = np.unique(keys, return_inverse=True)
+        order = np.argsort(buckets.ravel(), kind='stable')
+        ordered = buckets.ravel()[order]
+        starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        sizes = np.diff(np.r_[starts, count])
+
+        # Buckets of the same size are expanded into pairs together
+        for size in np.unique(sizes[sizes > 1]).tolist():
+            members = order[starts[sizes == size][:, None] + np.arange(size)]
+            a, b = np.triu_indices(size, k=1)
+            low = np.minimum(members[:, a], members[:, b])
+            high = np.maximum(members[:, a], members[:, b])
+            codes.append((low * count + high).ravel())
+    return split_codes(codes, count)
+
+def union_pairs(count, *pairs):
+    # Union of several (first, second) candidate arrays over the same rows
+    return split_codes([first * count + second for first, second in pairs], count)
+
+def split_codes(codes, count):
+    codes = np.unique(np.concatenate(codes)) if codes else np.empty(0, dtype=np.int64)
+    return codes // count, codes % count
+
+def exact_jaccard(sets):
+    # All-pairs Jaccard matrix from a sparse set x item product, as the exact render mode does
+    rows = np.repeat(np.arange(len(sets)), [len(s) for s in sets])
+    columns, _ = pd.factorize(np.concatenate([list(s) for s in sets]))
+    incidence = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)))
+    intersection = (incidence @ incidence.T).toarray()
+    sizes = np.diag(intersection)
+    return intersection / np.maximum(sizes[:, None] + sizes[None, :] - intersection, 1)
+
+def synthetic_libraries(users, library_size, catalog, rng):
+    # Users fall into taste groups of ten sharing part of a group library
+    group_libraries = [rng.choice(catalog, size=library_size, replace=False) for _ in range(max(users // 10, 1))]
+    sets = []
+    for user in range(users):
+        group = group_libraries[user % len(group_libraries)]
+        shared = rng.choice(group, size=int(library_size * rng.uniform(0.2, 0.8)), replace=False)
+        own = rng.choice(catalog, size=library_size - len(shared), replace=False)
+        sets.append(set(shared.tolist()) | set(own.tolist()))
+    return sets
+
+def run(sets, size, bands, threshold, exact=None):
+    # Sketch every set, then find and score candidates; returns timings and quality
+    start = time.perf_counter()
+    seeds = hash_seeds(size)
+    signatures = np.array([signature(list(s), seeds) for s in sets])
+    sketch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first, second = candidate_pairs(signatures, bands)
+    estimates = estimate_pairs(signatures, first, second)
+    score_time = time.perf_counter() - start
+
+    recall = error = None
+    if exact is not None:
+        similar = np.triu(exact >= threshold, k=1)
+        found = similar[first, second].sum()
+        recall = found / similar.sum() if similar.any() else 1.0
+        error = float(np.abs(estimates - exact[first, second]).mean()) if len(first) else 0.0
+    return sketch_time, score_time, len(first), recall, error
+
+def benchmark(users=400, library_size=2000, catalog=100000, threshold=0.3):
+    # Signature size and band trade-offs at a fixed number of users
+    rng = np.random.default_rng(SEED)
+    sets = synthetic_libraries(users, library_size, catalog, rng)
+    start = time.perf_counter()
+    exact = exact_jaccard(sets)
+    exact_time = time.perf_counter() - start
+
+    print(f'{users} users, {library_size} tracks each, '
+          f'{int(np.triu(exact >= threshold, k=1).sum())} pairs with Jaccard >= {threshold}')
+    print(f'exact: {exact_time:.2f}s for {users * (users - 1) // 2} pairs')
+    print('size  bands  sketch  score   candidates  recall  mean abs error')
+    for size, bands in [(64, 32), (128, 64), (128, 32), (256, 128)]:
+        sketch_time, score_time, candidates, recall, error = run(sets, size, bands, threshold, exact)
+        print(f'{size:<5} {bands:<6} {sketch_time:<7.2f} {score_time:<7.2f} {candidates:<11} {recall:<7.3f} {error:.4f}')
+
+def scaling_benchmark(user_counts=(1000, 4000, 8000, 16000), library_size=1000, catalog=200000,
+                      threshold=0.3, size=SIGNATURE_SIZE, bands=BANDS, exact_limit=16000):
+    # Exact versus MinHash as the number of libraries grows. Sketching happens once
+    # per library as it is loaded, scoring is the all-pairs step that exact mode
+    # does with a dense users x users product.
+    print(f'\n{library_size} tracks per user, {size} hashes in {bands} bands')
+    print('users  exact   sketch  score   candidates  recall  mean abs error')
+    for users in user_counts:
+        sets = synthetic_libraries(users, library_size, catalog, np.random.default_rng(SEED))
+        exact = None
+        exact_time = float('nan')
+        if users <= exact_limit:
+            start = time.perf_counter()
+            exact = exact_jaccard(sets)
+            exact_time = time.perf_counter() - start
+        sketch_time, score_time, candidates, recall, error = run(sets, size, bands, threshold, exact)
+        quality = f'{recall:<7.3f} {error:.4f}' if exact is not None else '-       -'
+        print(f'{users:<6} {exact_time:<7.2f} {sketch_time:<7.2f} {score_time:<7.2f} {candidates:<11} {quality}')
+
+def main():
+    benchmark()
+    scaling_benchmark()
+
+if __name__ == '__main__':
+    main()
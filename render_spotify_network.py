@@ -7,42 +7,49 @@
 # Imports
 import sys
 import os
+import asyncio
+import json
+import glob
+import time
+import queue
+import argparse
+import functools
+import collections
+import gzip
+import threading
+import multiprocessing
+import webbrowser
+import http.server
+import urllib.parse
+import posixpath
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import scipy.sparse as sp
 
 import pandas as pd
 import networkx as nx
 from pyvis.network import Network
+from jinja2.utils import htmlsafe_json_dumps
 
 from catppuccin import PALETTE
 
+import minhash
+import genre_enrichment
+import genre_shards
+import snapshot
+from genre_resolution import (
+    MAPPING_DB_PATH,
+    MAPPING_PATH,
+    GenreResolver,
+    load_compiled_mapping,
+    open_mapping_store,
+)
+
 # Globals
 DATA_PATH = "data/"
 OUTPUT_PATH = "out/"
 
-# Print header
-print("\n" + "-" * 50)
-print("Spotify Network Visualization 1.0")
-print("Indigo Hartsell")
-print("indiharts@proton.me")
-print("2024-08-31")
-print("-" * 50 + "\n")
-print(
-    """
-    ⠀⠀⠀⠀⠀⠀⠀⢀⣠⣤⣤⣶⣶⣶⣶⣤⣤⣄⡀⠀⠀⠀⠀⠀⠀⠀
-    ⠀⠀⠀⠀⢀⣤⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣤⡀⠀⠀⠀⠀
-    ⠀⠀⠀⣴⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⠀⠀⠀
-    ⠀⢀⣾⣿⡿⠿⠛⠛⠛⠉⠉⠉⠉⠛⠛⠛⠿⠿⣿⣿⣿⣿⣿⣷⡀⠀
-    ⠀⣾⣿⣿⣇⠀⣀⣀⣠⣤⣤⣤⣤⣤⣀⣀⠀⠀⠀⠈⠙⠻⣿⣿⣷⠀
-    ⢠⣿⣿⣿⣿⡿⠿⠟⠛⠛⠛⠛⠛⠛⠻⠿⢿⣿⣶⣤⣀⣠⣿⣿⣿⡄
-    ⢸⣿⣿⣿⣿⣇⣀⣀⣤⣤⣤⣤⣤⣄⣀⣀⠀⠀⠉⠛⢿⣿⣿⣿⣿⡇
-    ⠘⣿⣿⣿⣿⣿⠿⠿⠛⠛⠛⠛⠛⠛⠿⠿⣿⣶⣦⣤⣾⣿⣿⣿⣿⠃
-    ⠀⢿⣿⣿⣿⣿⣤⣤⣤⣤⣶⣶⣦⣤⣤⣄⡀⠈⠙⣿⣿⣿⣿⣿⡿⠀
-    ⠀⠈⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣾⣿⣿⣿⣿⡿⠁⠀
-    ⠀⠀⠀⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠀⠀⠀
-    ⠀⠀⠀⠀⠈⠛⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠛⠁⠀⠀⠀⠀
-    ⠀⠀⠀⠀⠀⠀⠀⠈⠙⠛⠛⠿⠿⠿⠿⠛⠛⠋⠁⠀⠀⠀⠀⠀⠀⠀
-    """
-)
-
 # Switches
 SHOW_VISUALIZATION = (
     True  # Set to False to disable opening the visualization in a browser
@@ -53,55 +60,286 @@ SHOW_CATEGORIES = True  # Set to False to disable showing category nodes
 WRITE_ENTRIES_WITHOUT_GENRE = (
     True  # Set to False to disable writing entries without genre to a file
 )
+ENRICH_MISSING_GENRES = (
+    False  # Set to True to look up genres for tracks exported without any
+)
+SHOW_GENRE_SIMILARITY = (
+    True  # Set to False to disable genre-genre co-occurrence edges
+)
+SHOW_USER_SIMILARITY = (
+    True  # Set to False to disable user-user taste similarity edges
+)
+DETECT_COMMUNITIES = (
+    False  # Set to True to tag every node with a detected community
+)
+COLOR_BY_COMMUNITY = (
+    False  # Set to True to color nodes by community instead of category
+)
+SIZE_BY_CENTRALITY = (
+    False  # Set to True to size nodes by centrality instead of by type alone
+)
+PRUNE_EDGES = (
+    False  # Set to True to keep only the statistical backbone of the busiest edges
+)
+PROGRESSIVE_LOADING = (
+    False  # Set to True to stream track nodes into the page by viewport tile
+)
+WRITE_GRAPH_DELTA = (
+    True  # Set to False to disable writing the change since the last run
+)
+WRITE_TIMELINE = (
+    False  # Set to True to animate how the libraries grew, using "Added At"
+)
+EXPORT_GRAPH = (
+    False  # Set to True to also write the graph for Gephi or Cytoscape
+)
+WRITE_SNAPSHOT = (
+    False  # Set to True to also draw the graph to an image without a browser
+)
+ASYNC_PIPELINE = (
+    False  # Set to True to overlap reading, cleaning and writing output
+)
 VERBOSE = True  # Set to False to disable verbose output
 
+# Watch mode settings (see --watch and --serve)
+SERVE_PORT = 8000  # Port for the local server
+WATCH_INTERVAL = 0.25  # Seconds between checks for changed files
+SERVING = False  # Set by --serve so the page listens for pushed deltas and queries
+
+# Preview settings (see --preview)
+PREVIEW_NODES = 0  # Set by --preview N to cap the graph at N nodes (0 for the full graph)
+PREVIEW_GENRE_SHARE = 0.2  # Share of the nodes left after users and categories kept for genres
+PREVIEW_OVERSAMPLE = 4  # Rows cleaned per preview node, spread evenly over the users
+PREVIEW_SEED = 42  # Seed of the random sample, so repeated previews match
+PREVIEW_OUTPUT_PATH = OUTPUT_PATH + "preview/"  # Where previews write their output
+
+# Timeline settings (see WRITE_TIMELINE)
+TIMELINE_PERIOD = "Q"  # "M" for a frame per month, "Q" for a frame per quarter
+
+# Graph export settings (see EXPORT_GRAPH)
+EXPORT_FORMATS = ["gexf", "graphml"]  # Written to out/network.<format>.gz
+EXPORT_LAYOUT = False  # Set to True to include precomputed node positions
+EXPORT_CHUNK_SIZE = 50000  # Nodes or edges formatted at a time
+EXPORT_COMPRESSION = 6  # gzip level, from 1 (fastest) to 9 (smallest)
+
+# Snapshot settings (see WRITE_SNAPSHOT)
+SNAPSHOT_FORMATS = ["png", "svg"]  # Written to out/network.<format>
+SNAPSHOT_WIDTH = 3840  # Image width in pixels
+SNAPSHOT_HEIGHT = 2160  # Image height in pixels
+
+# Async pipeline settings (see ASYNC_PIPELINE)
+PIPELINE_WORKERS = 4  # Exports cleaned at the same time
+PIPELINE_QUEUE_SIZE = 2  # Exports read ahead of the cleaners
+
+# Subgraph query settings (see --serve)
+SUBGRAPH_CACHE_SIZE = 256  # Number of recently requested subgraphs kept serialized
+SUBGRAPH_MAX_DEPTH = 3  # Deepest ego network that can be requested
+SUBGRAPH_MAX_NODES = 5000  # Ego networks stop expanding once they reach this size
+
+# Progressive loading settings
+LAYOUT_SCALE = 2000  # Radius of the precomputed layout in canvas units
+TRACK_SPACING = 30  # Distance between neighbouring tracks around their anchor node
+TILE_CAPACITY = 2000  # Most track nodes in one tile, denser tiles are split in four
+TILE_MIN_ZOOM = 3  # Zoom past the opening view at which track tiles start loading
+CANVAS_SIZE = 1000  # Width and height of the page's graph area in pixels
+
+# Genre enrichment settings (see ENRICH_MISSING_GENRES and genre_enrichment.py)
+ENRICHMENT_API_URL = genre_enrichment.API_URL  # Point at a mock server to test offline
+
+# Category assignment settings
+UNKNOWN_GENRE_WEIGHT = 1e-3  # Vote multiplier for genres that resolve to "Unknown"
+SHARE_PREFIX = "Share: "  # Prefix of the per-category share columns added by clean_data
+
+# Backend settings
+DATA_BACKEND = "pandas"  # "pandas", or "duckdb" to load, clean and aggregate with SQL
+DUCKDB_THREADS = 0  # Threads DuckDB may use (0 for one per core)
+DUCKDB_MEMORY_LIMIT = "4GB"  # Beyond this DuckDB spills to OUTPUT_PATH + "duckdb_tmp/"
+
+# Graph construction settings
+BUILD_PROCESSES = 1  # Processes that split genre lists in create_nodes_and_edges
+BUILD_SHARD_KEY = "user"  # Rows are sharded by "user", or by "track" (Spotify ID hash)
+
+# Node types, in the order of the type codes stored in NodeTable
+NODE_TYPES = ["user", "track", "genre", "category"]
+
+# Genre similarity settings
+GENRE_SIMILARITY_METRIC = "jaccard"  # One of "jaccard", "cosine" or "pmi"
+GENRE_SIMILARITY_TOP_K = 3  # Most similar genres kept per genre
+GENRE_SIMILARITY_MIN_COOCCURRENCE = 2  # Minimum shared tracks/users for an edge
+GENRE_SIMILARITY_SOURCES = [
+    "Spotify ID"
+]  # Incidence rows to count co-occurrence over; add "user" to include libraries
+
+# User similarity settings
+USER_SIMILARITY_TRACK_WEIGHT = 0.5  # Share of track overlap vs genre overlap
+USER_SIMILARITY_MIN = 0.05  # Minimum similarity for a user-user edge
+USER_SIMILARITY_MODE = "exact"  # "exact", or "minhash" for very large user populations
+MINHASH_SIGNATURE_SIZE = 128  # Hash functions per MinHash signature
+MINHASH_BANDS = 64  # LSH bands; more bands find less similar pairs (see minhash.py)
+
+# Community detection settings
+COMMUNITY_MAX_ITERATIONS = 50  # Maximum label propagation rounds
+COMMUNITY_TOLERANCE = 1e-3  # Stop once fewer than this share of nodes change label
+
+# Centrality sizing settings
+CENTRALITY_METRIC = "degree"  # "degree", "weighted_degree", "pagerank" or "betweenness"
+CENTRALITY_SCALING = "sqrt"  # "linear", "sqrt" or "log"
+CENTRALITY_SIZE_RANGE = 4  # Largest node of a type is this many times its base size
+BETWEENNESS_SAMPLES = 0  # Sampled sources for approximate betweenness (0 to skip)
+
+# Backbone settings (see PRUNE_EDGES)
+BACKBONE_RELATIONS = [  # Pairs of node types whose edges are pruned
+    ("user", "genre"),
+    ("track", "category"),
+]
+BACKBONE_ALPHA = 0.05  # Disparity filter significance level (0 to skip)
+BACKBONE_TOP_K = 1  # Also keep each node's k heaviest edges of a relation (0 to skip)
+
 # Check to make sure switches are compatible
 if not SHOW_GENRES and not SHOW_SONGS and not SHOW_CATEGORIES:
     print(
         "Error: At least one of SHOW_GENRES, SHOW_SONGS, or SHOW_CATEGORIES must be set to True."
     )
     sys.exit(1)
+if BUILD_SHARD_KEY not in ("user", "track"):
+    print("Error: BUILD_SHARD_KEY must be either \"user\" or \"track\".")
+    sys.exit(1)
+if not set(EXPORT_FORMATS) <= {"gexf", "graphml"}:
+    print("Error: EXPORT_FORMATS may only contain \"gexf\" and \"graphml\".")
+    sys.exit(1)
+if not set(SNAPSHOT_FORMATS) <= {"png", "svg"}:
+    print("Error: SNAPSHOT_FORMATS may only contain \"png\" and \"svg\".")
+    sys.exit(1)
+if WRITE_TIMELINE and PROGRESSIVE_LOADING:
+    print("Error: WRITE_TIMELINE cannot be combined with PROGRESSIVE_LOADING.")
+    sys.exit(1)
+if COLOR_BY_COMMUNITY and not DETECT_COMMUNITIES:
+    print("Error: COLOR_BY_COMMUNITY requires DETECT_COMMUNITIES to be set to True.")
+    sys.exit(1)
+if PRUNE_EDGES and BACKBONE_ALPHA <= 0 and BACKBONE_TOP_K <= 0:
+    print("Error: PRUNE_EDGES requires BACKBONE_ALPHA or BACKBONE_TOP_K to be above 0.")
+    sys.exit(1)
+if DATA_BACKEND not in ("pandas", "duckdb"):
+    print("Error: DATA_BACKEND must be either \"pandas\" or \"duckdb\".")
+    sys.exit(1)
+if DATA_BACKEND == "duckdb":
+    if ASYNC_PIPELINE:
+        print("Error: ASYNC_PIPELINE cannot be combined with the duckdb DATA_BACKEND.")
+        sys.exit(1)
+    if SHOW_USER_SIMILARITY and USER_SIMILARITY_MODE == "minhash":
+        print("Error: minhash USER_SIMILARITY_MODE requires the pandas DATA_BACKEND.")
+        sys.exit(1)
+    try:
+        import duckdb_backend
+    except ImportError as e:
+        print(f"Error: The duckdb DATA_BACKEND requires duckdb and pyarrow: {repr(e)}")
+        sys.exit(1)
+
+# Genre mapping store and resolver, opened by load_genre_resolver
+_mapping_store = None
+_genre_resolver = None
+
+# MinHash signatures of each user's track and genre sets, filled in during loading
+_user_signatures = {}
+_minhash_seeds = minhash.hash_seeds(MINHASH_SIGNATURE_SIZE)
 
-# Show switches
-print("\nRunning with options:")
-print("SHOW_VISUALIZATION:          " + str(SHOW_VISUALIZATION))
-print("SHOW_GENRES:                 " + str(SHOW_GENRES))
-print("SHOW_SONGS:                  " + str(SHOW_SONGS))
-print("SHOW_CATEGORIES:             " + str(SHOW_CATEGORIES))
-print("WRITE_ENTRIES_WITHOUT_GENRE: " + str(WRITE_ENTRIES_WITHOUT_GENRE))
-print("VERBOSE:                     " + str(VERBOSE))
-
-# Warn user if all 'SHOW' switches are True
-if SHOW_GENRES and SHOW_SONGS and SHOW_CATEGORIES:
+# How the last preview was sampled, added to its page
+_preview_sampling = None
+
+# ---------------------------- Functions ----------------------------
+
+
+# Setup
+def print_header():
+    # Banner and options, printed by the script rather than on import, so that
+    # importers and workers started with "spawn" stay quiet
+    print("\n" + "-" * 50)
+    print("Spotify Network Visualization 1.0")
+    print("Indigo Hartsell")
+    print("indiharts@proton.me")
+    print("2024-08-31")
+    print("-" * 50 + "\n")
     print(
-        "\nWarning: All 'SHOW' switches are set to True. This may result in a large number of nodes and edges. Rendering will take a long time!"
+        """
+    ⠀⠀⠀⠀⠀⠀⠀⢀⣠⣤⣤⣶⣶⣶⣶⣤⣤⣄⡀⠀⠀⠀⠀⠀⠀⠀
+    ⠀⠀⠀⠀⢀⣤⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣤⡀⠀⠀⠀⠀
+    ⠀⠀⠀⣴⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⠀⠀⠀
+    ⠀⢀⣾⣿⡿⠿⠛⠛⠛⠉⠉⠉⠉⠛⠛⠛⠿⠿⣿⣿⣿⣿⣿⣷⡀⠀
+    ⠀⣾⣿⣿⣇⠀⣀⣀⣠⣤⣤⣤⣤⣤⣀⣀⠀⠀⠀⠈⠙⠻⣿⣿⣷⠀
+    ⢠⣿⣿⣿⣿⡿⠿⠟⠛⠛⠛⠛⠛⠛⠻⠿⢿⣿⣶⣤⣀⣠⣿⣿⣿⡄
+    ⢸⣿⣿⣿⣿⣇⣀⣀⣤⣤⣤⣤⣤⣄⣀⣀⠀⠀⠉⠛⢿⣿⣿⣿⣿⡇
+    ⠘⣿⣿⣿⣿⣿⠿⠿⠛⠛⠛⠛⠛⠛⠿⠿⣿⣶⣦⣤⣾⣿⣿⣿⣿⠃
+    ⠀⢿⣿⣿⣿⣿⣤⣤⣤⣤⣶⣶⣦⣤⣤⣄⡀⠈⠙⣿⣿⣿⣿⣿⡿⠀
+    ⠀⠈⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣾⣿⣿⣿⣿⡿⠁⠀
+    ⠀⠀⠀⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠀⠀⠀
+    ⠀⠀⠀⠀⠈⠛⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠛⠁⠀⠀⠀⠀
+    ⠀⠀⠀⠀⠀⠀⠀⠈⠙⠛⠛⠿⠿⠿⠿⠛⠛⠋⠁⠀⠀⠀⠀⠀⠀⠀
+    """
     )
 
-# Init
-print("\nInitializing...") if VERBOSE else None
+    # Show switches
+    print("\nRunning with options:")
+    print("SHOW_VISUALIZATION:          " + str(SHOW_VISUALIZATION))
+    print("SHOW_GENRES:                 " + str(SHOW_GENRES))
+    print("SHOW_SONGS:                  " + str(SHOW_SONGS))
+    print("SHOW_CATEGORIES:             " + str(SHOW_CATEGORIES))
+    print("WRITE_ENTRIES_WITHOUT_GENRE: " + str(WRITE_ENTRIES_WITHOUT_GENRE))
+    print("ENRICH_MISSING_GENRES:       " + str(ENRICH_MISSING_GENRES))
+    print("SHOW_GENRE_SIMILARITY:       " + str(SHOW_GENRE_SIMILARITY))
+    print("SHOW_USER_SIMILARITY:        " + str(SHOW_USER_SIMILARITY))
+    print("DETECT_COMMUNITIES:          " + str(DETECT_COMMUNITIES))
+    print("COLOR_BY_COMMUNITY:          " + str(COLOR_BY_COMMUNITY))
+    print("SIZE_BY_CENTRALITY:          " + str(SIZE_BY_CENTRALITY))
+    print("PRUNE_EDGES:                 " + str(PRUNE_EDGES))
+    print("PROGRESSIVE_LOADING:         " + str(PROGRESSIVE_LOADING))
+    print("WRITE_GRAPH_DELTA:           " + str(WRITE_GRAPH_DELTA))
+    print("WRITE_TIMELINE:              " + str(WRITE_TIMELINE))
+    print("EXPORT_GRAPH:                " + str(EXPORT_GRAPH))
+    print("WRITE_SNAPSHOT:              " + str(WRITE_SNAPSHOT))
+    print("ASYNC_PIPELINE:              " + str(ASYNC_PIPELINE))
+    print("VERBOSE:                     " + str(VERBOSE))
+
+    # Warn user if all 'SHOW' switches are True
+    if SHOW_GENRES and SHOW_SONGS and SHOW_CATEGORIES:
+        print(
+            "\nWarning: All 'SHOW' switches are set to True. This may result in a large number of nodes and edges. Rendering will take a long time!"
+        )
+
+    # Init
+    print("\nInitializing...") if VERBOSE else None
 
-# Load genre mapping once lol
-_genre_to_category = {}
-try:
-    _genre_mapping = pd.read_json("genre_mapping.json", typ="series")
-    _genre_to_category = _genre_mapping.to_dict()
-    print("Genre mapping loaded successfully.") if VERBOSE else None
-except Exception as e:
-    print(f"Error loading genre mapping: {repr(e)}")
-    sys.exit(1)
 
-# ---------------------------- Functions ----------------------------
+def load_genre_resolver():
+    # Open the genre mapping store and build its resolver on first use
+    global _mapping_store, _genre_resolver
+    if _genre_resolver is None:
+        _mapping_store = open_mapping_store()
+        _genre_resolver = GenreResolver(
+            load_compiled_mapping(_mapping_store), _mapping_store
+        )
+    return _genre_resolver
 
 
 # Helpers
 def genre_to_category(genre):
-    return (
-        _genre_to_category[genre] if genre in _genre_to_category.keys() else "Unknown"
-    )
+    return load_genre_resolver().resolve(genre)
+
+
+def resolve_genres(genres):
+    # Categories of many genres, looking up the mapped ones in batches
+    resolver = load_genre_resolver()
+    resolver.prefetch(genres)
+    return [resolver.resolve(genre) for genre in genres]
+
+
+def print_resolver_report():
+    print("Genres resolved by tier:")
+    for tier, count in load_genre_resolver().report().items():
+        print("  " + tier.ljust(12) + str(count))
 
 
 def get_category_list():
-    categories = list(_genre_to_category.values())
+    categories = list(load_genre_resolver().categories)
     return categories
 
 
@@ -112,7 +350,392 @@ def alter_rgb(color, factor):
     return f"rgb({r},{g},{b})"
 
 
+def add_user_signatures(user, data):
+    genres = data["Genres"].dropna().str.split(",").explode()
+    signatures = (
+        minhash.signature(data["Spotify ID"].dropna(), _minhash_seeds),
+        minhash.signature(genres[genres != ""], _minhash_seeds),
+    )
+
+    # Users split over several files get the signature of their combined library
+    if user in _user_signatures:
+        signatures = tuple(
+            minhash.merge(old, new)
+            for old, new in zip(_user_signatures[user], signatures)
+        )
+    _user_signatures[user] = signatures
+
+
+# Graph tables
+class Palette:
+    # Interned color strings, so tables store a small integer per node or edge
+    def __init__(self):
+        self.colors = []
+        self.rows = {}
+
+    def row(self, color):
+        if color not in self.rows:
+            self.rows[color] = len(self.colors)
+            self.colors.append(color)
+        return self.rows[color]
+
+    def intern(self, colors, count):
+        # Palette indices for a single color or an array of colors
+        if isinstance(colors, str):
+            return np.full(count, self.row(colors), dtype=np.int32)
+        codes, uniques = pd.factorize(np.asarray(colors, dtype=object))
+        rows = np.array([self.row(color) for color in uniques], dtype=np.int32)
+        return rows[codes]
+
+    def lookup(self, indices):
+        return np.array(self.colors, dtype=object)[indices]
+
+
+class NodeTable:
+    # Struct-of-arrays node storage. Ids are interned to row numbers, colors are
+    # palette indices and numeric attributes are NumPy arrays.
+    def __init__(self, palette):
+        self.palette = palette
+        self.ids = []
+        self.labels = []
+        self.genres = []
+        self.categories = []
+        self.type = np.empty(0, dtype=np.int8)
+        self.color = np.empty(0, dtype=np.int32)
+        self.size = np.empty(0, dtype=np.float64)
+        self.community = np.empty(0, dtype=np.int32)
+        self._index = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        # Per-node dicts, for consumers that have not moved to the arrays
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def record(self, row):
+        node = {
+            "id": self.ids[row],
+            "type": NODE_TYPES[self.type[row]],
+            "label": self.labels[row],
+            "color": self.palette.colors[self.color[row]],
+            "size": float(self.size[row]),
+        }
+        if self.genres[row] is not None:
+            node["genre"] = self.genres[row]
+        if self.categories[row] is not None:
+            node["category"] = self.categories[row]
+        if self.community[row] >= 0:
+            node["community"] = int(self.community[row])
+        return node
+
+    @property
+    def index(self):
+        # pandas Index over the ids for vectorized id to row lookups
+        if self._index is None:
+            self._index = pd.Index(self.ids, dtype=object)
+        return self._index
+
+    def rows(self, ids):
+        # Row of each id, or -1 for ids that are not in the table
+        return self.index.get_indexer(pd.Index(np.asarray(ids, dtype=object)))
+
+    def add(
+        self, ids, labels, node_type, colors, size, genres=None, categories=None
+    ):
+        # Append nodes of one type, skipping ids that are already in the table
+        ids = np.asarray(ids, dtype=object)
+        labels = np.asarray(labels, dtype=object)
+        if genres is None:
+            genres = np.full(len(ids), None, dtype=object)
+        genres = np.asarray(genres, dtype=object)
+        if categories is None:
+            categories = np.full(len(ids), None, dtype=object)
+        categories = np.asarray(categories, dtype=object)
+        colors = self.palette.intern(colors, len(ids))
+        sizes = np.broadcast_to(np.asarray(size, dtype=np.float64), len(ids))
+
+        new = ~pd.Index(ids).duplicated() & (self.rows(ids) < 0)
+        count = int(new.sum())
+        self.ids.extend(ids[new].tolist())
+        self.labels.extend(labels[new].tolist())
+        self.genres.extend(genres[new].tolist())
+        self.categories.extend(categories[new].tolist())
+        self.type = np.concatenate(
+            [self.type, np.full(count, NODE_TYPES.index(node_type), dtype=np.int8)]
+        )
+        self.color = np.concatenate([self.color, colors[new]])
+        self.size = np.concatenate([self.size, sizes[new]])
+        self.community = np.concatenate(
+            [self.community, np.full(count, -1, dtype=np.int32)]
+        )
+        self._index = None
+        return count
+
+    def type_mask(self, node_type):
+        return self.type == NODE_TYPES.index(node_type)
+
+    def types(self):
+        return np.array(NODE_TYPES, dtype=object)[self.type]
+
+    def to_frame(self, rows=None):
+        # Column-wise view of the table (or some of its rows) for exporters
+        rows = np.arange(len(self)) if rows is None else rows
+        frame = pd.DataFrame(
+            {
+                "id": np.array(self.ids, dtype=object)[rows],
+                "label": np.array(self.labels, dtype=object)[rows],
+                "type": self.types()[rows],
+                "size": self.size[rows],
+                "color": self.palette.lookup(self.color[rows]),
+            }
+        )
+        if (self.community >= 0).any():
+            frame["community"] = self.community[rows]
+        return frame
+
+
+class EdgeTable:
+    # Struct-of-arrays edge storage with endpoints stored as NodeTable rows
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.palette = nodes.palette
+        self.source = np.empty(0, dtype=np.int64)
+        self.target = np.empty(0, dtype=np.int64)
+        self.color = np.empty(0, dtype=np.int32)
+        self.weight = np.empty(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.source)
+
+    def __iter__(self):
+        # Per-edge dicts, for consumers that have not moved to the arrays
+        for row in range(len(self)):
+            yield {
+                "source": self.nodes.ids[self.source[row]],
+                "target": self.nodes.ids[self.target[row]],
+                "color": self.palette.colors[self.color[row]],
+                "weight": float(self.weight[row]),
+            }
+
+    def add(self, sources, targets, colors, weights=1.0):
+        # Append edges by node id, dropping any whose endpoints are not nodes
+        sources = self.nodes.rows(sources)
+        targets = self.nodes.rows(targets)
+        colors = self.palette.intern(colors, len(sources))
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), len(sources))
+
+        valid = (sources >= 0) & (targets >= 0)
+        self.source = np.concatenate([self.source, sources[valid]])
+        self.target = np.concatenate([self.target, targets[valid]])
+        self.color = np.concatenate([self.color, colors[valid]])
+        self.weight = np.concatenate([self.weight, weights[valid]])
+        return int(valid.sum())
+
+    def select(self, keep):
+        # Keep only the edges in a boolean mask or array of rows
+        self.source = self.source[keep]
+        self.target = self.target[keep]
+        self.color = self.color[keep]
+        self.weight = self.weight[keep]
+
+    def deduplicate(self):
+        # The graph is undirected, so keep the first of any repeated node pair
+        low = np.minimum(self.source, self.target)
+        high = np.maximum(self.source, self.target)
+        _, first = np.unique(low * len(self.nodes) + high, return_index=True)
+        self.select(np.sort(first))
+
+    def keys(self, rows=None):
+        # Stable id for each edge, independent of the direction it was added in
+        rows = np.arange(len(self)) if rows is None else rows
+        ids = pd.Series(self.nodes.ids, dtype=object).astype(str).to_numpy()
+        source = ids[self.source[rows]]
+        target = ids[self.target[rows]]
+        return np.where(
+            source <= target,
+            source + "|" + target,
+            target + "|" + source,
+        ).astype(object)
+
+    def to_frame(self, rows=None):
+        rows = np.arange(len(self)) if rows is None else rows
+        ids = np.array(self.nodes.ids, dtype=object)
+        return pd.DataFrame(
+            {
+                "id": self.keys(rows),
+                "source": ids[self.source[rows]],
+                "target": ids[self.target[rows]],
+                "color": self.palette.lookup(self.color[rows]),
+                "weight": self.weight[rows],
+            }
+        )
+
+
+class TableNetwork(Network):
+    # pyvis network whose page is rendered around node and edge JSON serialized
+    # straight from the tables, rather than from a dict per node and edge. The
+    # records never enter self.nodes and self.edges, so pyvis helpers that read
+    # those (num_nodes, get_nodes, the select and filter menus) do not see them.
+    SLOTS = {
+        "nodes|tojson": "nodes_json",
+        "edges|tojson": "edges_json",
+        "nodes|length": "node_count",
+    }
+
+    def set_records(self, nodes_json, edges_json, node_count):
+        self.nodes_json = nodes_json
+        self.edges_json = edges_json
+        self.node_count = node_count
+
+    def generate_html(self, name="index.html", local=True, notebook=False):
+        if self.select_menu or self.filter_menu:
+            raise ValueError("The select and filter menus need pyvis node records")
+
+        # Point the template's node and edge slots at the serialized records
+        source, _, _ = self.templateEnv.loader.get_source(self.templateEnv, self.path)
+        for slot, variable in self.SLOTS.items():
+            if slot not in source:
+                raise ValueError(f"pyvis template {self.path} has no {slot} slot")
+            source = source.replace(slot, variable)
+
+        _, _, heading, height, width, options = self.get_network_data()
+        if isinstance(self.options, dict):
+            physics_enabled = self.options.get("physics", {}).get("enabled", True)
+        else:
+            physics_enabled = self.options.physics.enabled
+        self.html = self.templateEnv.from_string(source).render(
+            height=height,
+            width=width,
+            nodes_json=htmlsafe_json_dumps(self.nodes_json, dumps=str),
+            edges_json=htmlsafe_json_dumps(self.edges_json, dumps=str),
+            node_count=self.node_count,
+            heading=heading,
+            options=options,
+            physics_enabled=physics_enabled,
+            use_DOT=self.use_DOT,
+            dot_lang=self.dot_lang,
+            widget=self.widget,
+            bgcolor=self.bgcolor,
+            conf=self.conf,
+            tooltip_link=False,
+            neighborhood_highlight=self.neighborhood_highlight,
+            select_menu=self.select_menu,
+            filter_menu=self.filter_menu,
+            notebook=notebook,
+            cdn_resources=self.cdn_resources,
+        )
+        return self.html
+
+
+def node_records_json(nodes, rows, positions=None):
+    # vis.js node records serialized straight from the table arrays
+    frame = nodes.to_frame(rows)
+    if positions is not None:
+        frame["x"] = positions[rows, 0]
+        frame["y"] = positions[rows, 1]
+    return frame.to_json(orient="records")
+
+
+def edge_records_json(edges, rows):
+    frame = edges.to_frame(rows).rename(
+        columns={"source": "from", "target": "to", "weight": "width"}
+    )
+    return frame.to_json(orient="records")
+
+
+class SubgraphIndex:
+    # Adjacency index over a built graph for serving parts of it on request.
+    # Neighbours of each node row are stored contiguously, CSR style, alongside
+    # the edge row that links them. Serialized subgraphs are kept in an LRU cache.
+    def __init__(self, nodes, edges, cache_size=SUBGRAPH_CACHE_SIZE):
+        self.nodes = nodes
+        self.edges = edges
+        rows = np.concatenate([edges.source, edges.target])
+        order = np.argsort(rows, kind="stable")
+        self.neighbours = np.concatenate([edges.target, edges.source])[order]
+        self.edge_rows = np.tile(np.arange(len(edges)), 2)[order]
+        self.indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(rows, minlength=len(nodes)))]
+        )
+
+        # Memoize per index, so a rebuild starts with an empty cache
+        self.query = functools.lru_cache(maxsize=cache_size)(self._query)
+
+    def row(self, node_id):
+        # Node ids arrive as URL text, but track ids may be numeric in the table
+        for candidate in (node_id, int(node_id) if node_id.isdigit() else None):
+            if candidate is not None and candidate in self.nodes.index:
+                return int(self.nodes.index.get_loc(candidate))
+        return -1
+
+    def incident(self, rows):
+        # Positions in the neighbour arrays of every edge touching the given rows
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return offsets + np.arange(counts.sum())
+
+    def ego(self, row, depth):
+        # Breadth-first expansion from one node, stopping early at SUBGRAPH_MAX_NODES
+        visited = np.zeros(len(self.nodes), dtype=bool)
+        visited[row] = True
+        frontier = np.array([row])
+        for _ in range(depth):
+            reached = np.unique(self.neighbours[self.incident(frontier)])
+            frontier = reached[~visited[reached]]
+            room = SUBGRAPH_MAX_NODES - int(visited.sum())
+            frontier = frontier[:room]
+            visited[frontier] = True
+            if len(frontier) == 0 or room <= len(frontier):
+                break
+        return np.flatnonzero(visited)
+
+    def _query(self, node_id, depth=1, node_type=None):
+        # vis.js JSON for a node's ego network, or None if there is no such node
+        row = self.row(node_id)
+        if row < 0 or (node_type and NODE_TYPES[self.nodes.type[row]] != node_type):
+            return None
+        rows = self.ego(row, depth)
+
+        # Keep the edges whose endpoints both made it into the subgraph
+        selected = np.zeros(len(self.nodes), dtype=bool)
+        selected[rows] = True
+        positions = self.incident(rows)
+        edge_rows = np.unique(
+            self.edge_rows[positions][selected[self.neighbours[positions]]]
+        )
+        return (
+            '{"nodes": '
+            + node_records_json(self.nodes, rows)
+            + ', "edges": '
+            + edge_records_json(self.edges, edge_rows)
+            + "}"
+        )
+
+
 # Main Functions
+def load_data_file(filename):
+    print("Loading data from file: " + filename) if VERBOSE else None
+    data = pd.read_csv(DATA_PATH + filename)
+
+    # Get the name of the spotify user from the first part of the filename
+    user = filename.split("_")[0]
+
+    # Add user as an additional column in the dataframe
+    data["user"] = user
+
+    # Sketch the user's library while it is in hand
+    if SHOW_USER_SIMILARITY and USER_SIMILARITY_MODE == "minhash" and not data.empty:
+        add_user_signatures(user, data)
+
+    print("Data sample for " + user + ":") if VERBOSE else None
+    print(data.head()) if VERBOSE else None
+
+    return data
+
+
 def load_data_from_csv():
     # Get filenames from datapath
     filenames = os.listdir(DATA_PATH)
@@ -120,26 +743,88 @@ def load_data_from_csv():
     # Load data from each file
     data_list = []
     for filename in filenames:
-        print("Loading data from file: " + filename) if VERBOSE else None
-        data = pd.read_csv(DATA_PATH + filename)
+        data_list.append(load_data_file(filename))
 
-        # Get the name of the spotify user from the first part of the filename
-        user = filename.split("_")[0]
+    # Concatenate all dataframes into one
+    combined_data = pd.concat(data_list)
+    return combined_data
 
-        # Add user as an additional column in the dataframe
-        data["user"] = user
 
-        data_list.append(data)
+def enrich_missing_genres(data):
+    # Fill in the genres of tracks exported without any from their artists' genres
+    missing = data["Genres"].isna() & data["Artist IDs"].notna()
+    if not missing.any():
+        return data
+
+    artist_lists = data.loc[missing, "Artist IDs"].str.split(",")
+    artist_genres = lookup_artist_genres(artist_lists.explode().unique().tolist())
+    genres = artist_lists.map(
+        lambda artist_ids: ",".join(
+            dict.fromkeys(
+                genre
+                for artist_id in artist_ids
+                for genre in artist_genres.get(artist_id, [])
+            )
+        )
+    )
+    data = data.copy()
+    data.loc[missing, "Genres"] = genres.where(genres != "")
+    (
+        print(
+            f"Found genres for {int((genres != '').sum())} of {int(missing.sum())} "
+            "tracks exported without any."
+        )
+        if VERBOSE
+        else None
+    )
+    return data
 
-        print("Data sample for " + user + ":") if VERBOSE else None
-        print(data.head()) if VERBOSE else None
 
-    # Concatenate all dataframes into one
-    combined_data = pd.concat(data_list)
-    return combined_data
+def lookup_artist_genres(artist_ids):
+    # Genres of each artist, or none at all if they cannot be looked up, in which
+    # case the tracks without genres are dropped as they would be without enrichment
+    enrichment = _enrichment_client()
+    if enrichment is None:
+        return {}
+    client, cache = enrichment
+    try:
+        return genre_enrichment.enrich(artist_ids, client, cache)
+    except RuntimeError as e:
+        print(
+            "Warning: Looking up genres failed, tracks exported without any are "
+            f"dropped: {repr(e)}"
+        )
+        return {}
+
+
+@functools.lru_cache(maxsize=None)
+def _enrichment_client():
+    # One client and cache per run, shared by every export, so connections are
+    # reused and exports cleaned in parallel save to the same cache. None if the
+    # Spotify API would be called without a token.
+    token_variable = genre_enrichment.TOKEN_VARIABLE
+    if ENRICHMENT_API_URL == genre_enrichment.API_URL and not os.environ.get(
+        token_variable
+    ):
+        print(
+            f"Warning: {token_variable} is not set, so genres are not looked up and "
+            "tracks exported without any are dropped."
+        )
+        return None
+    return (
+        genre_enrichment.ArtistGenreClient(ENRICHMENT_API_URL),
+        genre_enrichment.GenreCache(),
+    )
 
 
-def clean_data(data):
+def clean_rows(data):
+    # Row by row cleaning, which gives the same result whether it is run on every
+    # export at once or on each export separately
+
+    # Tracks without genres would be dropped below, so try to look theirs up first
+    if ENRICH_MISSING_GENRES and "Artist IDs" in data.columns:
+        data = enrich_missing_genres(data)
+
     # Filter out any data that doesn't have necessary fields
     required_columns = ["Spotify ID", "Genres", "Track Name", "Artist Name(s)", "user"]
     data = data.dropna(
@@ -150,24 +835,9 @@ def clean_data(data):
     for column in ["Track Name", "Artist Name(s)", "Genres", "user"]:
         data.loc[:, column] = data[column].str.replace(r"[^\x00-\x7F]+", "", regex=True)
 
-    # Resolve duplicate track names with different Spotify IDs
-    duplicate_tracks = data[data.duplicated(subset="Track Name", keep=False)]
-    if not duplicate_tracks.empty:
-        (
-            print(
-                f"Found {len(duplicate_tracks)} duplicate track names. Attempting to resolve."
-            )
-            if VERBOSE
-            else None
-        )
-
     # Ensure no duplicates in index
     data = data.reset_index(drop=True)
 
-    data.loc[duplicate_tracks.index, "Spotify ID"] = data.groupby("Track Name")[
-        "Spotify ID"
-    ].transform("first")
-
     print("Mapping genres to categories...") if VERBOSE else None
 
     # Create a new column for the primary genre of each track (first genre in list)
@@ -175,12 +845,130 @@ def clean_data(data):
         lambda x: x.split(", ")[0].split(",")[0]
     )
 
-    # Create a new column for the category of each genre
-    data["Category"] = data["Primary Genre"].apply(genre_to_category)
+    # Explode the genre lists, keeping the position of each genre in its list
+    genres = data["Genres"].str.split(",").explode().str.strip()
+    exploded = pd.DataFrame({"Genre": genres[genres != ""]})
+    exploded["Position"] = exploded.groupby(level=0).cumcount()
+
+    # Resolve each distinct genre once
+    distinct_genres = exploded["Genre"].unique().tolist()
+    exploded["Category"] = exploded["Genre"].map(
+        dict(zip(distinct_genres, resolve_genres(distinct_genres)))
+    )
+
+    # Vote for categories with weights decaying by position in the genre list.
+    # Unknown genres only win when none of a track's genres are mapped.
+    exploded["Weight"] = 1.0 / (exploded["Position"] + 1)
+    exploded.loc[exploded["Category"] == "Unknown", "Weight"] *= UNKNOWN_GENRE_WEIGHT
+    votes = exploded.groupby([exploded.index, "Category"])["Weight"].sum()
+    shares = (votes / votes.groupby(level=0).transform("sum")).unstack(fill_value=0.0)
+
+    # Create a new column for the winning category, and keep the distribution
+    data["Category"] = shares.idxmax(axis=1).reindex(data.index)
+    shares = shares.add_prefix(SHARE_PREFIX).reindex(data.index, fill_value=0.0)
+    data = pd.concat([data, shares], axis=1)
 
     # Set category to "Unknown" if genre is not in the dictionary
     data.loc[data["Category"].isnull(), "Category"] = "Unknown"
 
+    return data
+
+
+def combine_cleaned(frames):
+    # Cleaning steps that need every export, run on the output of clean_rows
+    data = pd.concat(frames, ignore_index=True)
+
+    # Exports only carry share columns for the categories they contain
+    share_columns = sorted(c for c in data.columns if c.startswith(SHARE_PREFIX))
+    data[share_columns] = data[share_columns].fillna(0.0)
+    data = data[[c for c in data.columns if c not in share_columns] + share_columns]
+
+    data = resolve_duplicate_tracks(data)
+
+    print_resolver_report() if VERBOSE else None
+
+    return data
+
+
+def track_keys(data):
+    # Integer key per normalized (track name, artists) pair. Each distinct string
+    # is only normalized once, then hash-factorized into a code.
+    def normalized_codes(column):
+        codes, uniques = pd.factorize(data[column])
+        normalized = (
+            pd.Series(uniques, dtype=object).str.casefold().str.split().str.join(" ")
+        )
+        normalized_codes, normalized_uniques = pd.factorize(normalized)
+        return normalized_codes[codes].astype(np.int64), len(normalized_uniques)
+
+    name_codes, _ = normalized_codes("Track Name")
+    artist_codes, artist_count = normalized_codes("Artist Name(s)")
+    return name_codes * artist_count + artist_codes
+
+
+def resolve_duplicate_tracks(data):
+    # The same song can appear under several Spotify IDs (singles, albums,
+    # remasters). Give every ID of a song the first ID seen for it, keyed on
+    # track name and artists so different songs sharing a title stay apart.
+    keys = track_keys(data)
+    ids = data["Spotify ID"].to_numpy(dtype=object)
+
+    # Canonical ID per key, then per Spotify ID, built once
+    first = ~pd.Index(keys).duplicated()
+    canonical = pd.Series(ids[first], index=keys[first])
+    id_map = pd.DataFrame(
+        {"Spotify ID": ids, "Canonical ID": canonical.reindex(keys).to_numpy()}
+    ).drop_duplicates("Spotify ID")
+    id_map = id_map[id_map["Spotify ID"] != id_map["Canonical ID"]]
+
+    if not id_map.empty:
+        data["Spotify ID"] = (
+            data["Spotify ID"]
+            .map(id_map.set_index("Spotify ID")["Canonical ID"])
+            .fillna(data["Spotify ID"])
+        )
+    write_canonical_ids(id_map)
+
+    return data
+
+
+def write_canonical_ids(id_map):
+    if not id_map.empty:
+        id_map.to_csv(OUTPUT_PATH + "canonical_track_ids.csv", index=False)
+    (
+        print(
+            f"Merged {len(id_map)} duplicate Spotify IDs into "
+            f"{id_map['Canonical ID'].nunique()} tracks."
+        )
+        if VERBOSE
+        else None
+    )
+
+
+def load_and_clean_duckdb():
+    # Load, clean and aggregate every export with SQL (see duckdb_backend.py),
+    # returning the same cleaned data and tables as the pandas path
+    enrich = lookup_artist_genres if ENRICH_MISSING_GENRES else None
+    cleaned, id_map, tables = duckdb_backend.load_and_clean(
+        [DATA_PATH + filename for filename in os.listdir(DATA_PATH)],
+        resolve_genres,
+        UNKNOWN_GENRE_WEIGHT,
+        SHARE_PREFIX,
+        enrich,
+        DUCKDB_THREADS,
+        DUCKDB_MEMORY_LIMIT,
+        OUTPUT_PATH + "duckdb_tmp/",
+    )
+    write_canonical_ids(id_map.to_pandas())
+
+    print_resolver_report() if VERBOSE else None
+
+    return cleaned.to_pandas(), {
+        name: table.to_pandas() for name, table in tables.items()
+    }
+
+
+def write_entries_without_genre(data):
     # Write entries without category to a file
     if WRITE_ENTRIES_WITHOUT_GENRE:
         entries_without_genre = data[data["Category"] == "Unknown"]
@@ -199,51 +987,311 @@ def clean_data(data):
         else:
             print("No entries without genre found.") if VERBOSE else None
 
-    return data
 
+def clean_data(data):
+    data = combine_cleaned([clean_rows(data)])
+    write_entries_without_genre(data)
+    return data
 
-def create_nodes_and_edges(data):
-    # Extract unique users and Spotify IDs from dataframe
-    users = data["user"].unique().tolist()
-    spotify_ids = data["Spotify ID"].unique().tolist()
 
-    nodes = []
-    edges = []
+def start_preview(nodes):
+    # Cap every later build at nodes and send its output, graph state and delta
+    # included, to PREVIEW_OUTPUT_PATH, so a preview never overwrites a full run's
+    global PREVIEW_NODES, OUTPUT_PATH
+    PREVIEW_NODES = nodes
+    OUTPUT_PATH = PREVIEW_OUTPUT_PATH
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+
+
+def preview_rows(data):
+    # Random rows of each user, so cleaning a preview takes the same time
+    # however large the exports are
+    per_user = int(np.ceil(PREVIEW_OVERSAMPLE * PREVIEW_NODES / data["user"].nunique()))
+    rng = np.random.default_rng(PREVIEW_SEED)
+    shuffled = data.reset_index(drop=True).iloc[rng.permutation(len(data))]
+    kept = shuffled[shuffled.groupby("user").cumcount() < per_user]
+    return kept.sort_index()
+
+
+def allocate_quotas(sizes, budget):
+    # Split the budget over strata in proportion to their sizes, by largest
+    # remainder, with at least one row for every stratum while the budget allows
+    sizes = np.asarray(sizes, dtype=np.int64)
+    if budget >= sizes.sum():
+        return sizes
+    base = np.minimum(sizes, 1) if budget >= len(sizes) else np.zeros_like(sizes)
+    exact = (sizes - base) * (budget - base.sum()) / (sizes - base).sum()
+    quotas = base + np.floor(exact).astype(np.int64)
+    leftover = budget - quotas.sum()
+    quotas[np.argsort(np.floor(exact) - exact, kind="stable")[:leftover]] += 1
+    return quotas
+
+
+def sample_preview(data, user_rows=None, read_rows=None):
+    # Cap the graph at PREVIEW_NODES nodes. Every user and category is kept, along
+    # with the most common genres, and the rest of the budget goes to tracks,
+    # sampled in proportion to each (user, category) stratum.
+    global _preview_sampling
+    users = data["user"].nunique()
+    categories = len(set(get_category_list() + ["Unknown"])) if SHOW_CATEGORIES else 0
+    remaining = PREVIEW_NODES - users - categories
+    if remaining < 0:
+        raise ValueError(
+            f"A preview of {PREVIEW_NODES} nodes cannot fit the {users} users and "
+            f"{categories} categories, which are always kept"
+        )
+    genre_budget = 0
+    if SHOW_GENRES:
+        genre_budget = int(remaining * PREVIEW_GENRE_SHARE) if SHOW_SONGS else remaining
+    track_budget = remaining - genre_budget if SHOW_SONGS else len(data)
+
+    # Share of each user's rows that was read, when only some were
+    cleaned_rows = data["user"].value_counts()
+    user_rows = cleaned_rows if user_rows is None else user_rows
+    read_rows = cleaned_rows if read_rows is None else read_rows
+    read_share = read_rows / user_rows
+
+    rng = np.random.default_rng(PREVIEW_SEED)
+    shuffled = data.reset_index(drop=True).iloc[rng.permutation(len(data))]
+    strata = shuffled.groupby(["user", "Category"], sort=True).size()
+    quotas = pd.Series(allocate_quotas(strata, track_budget), index=strata.index)
+    rank = shuffled.groupby(["user", "Category"]).cumcount()
+    limit = quotas.reindex(pd.MultiIndex.from_frame(shuffled[["user", "Category"]]))
+    sampled = shuffled[rank.to_numpy() < limit.to_numpy()].sort_index()
+
+    # Keep only the most common genres in the sampled genre lists
+    genre_counts = explode_genres(data)["Genre"].value_counts()
+    top_genres = set(genre_counts.index[:genre_budget])
+    sampled = sampled.reset_index(drop=True)
+    sampled["Genres"] = (
+        sampled["Genres"]
+        .str.split(",")
+        .map(lambda genres: ",".join(g for g in genres if g in top_genres))
+    )
 
-    # Create nodes for users
-    for user in users:
-        print("Adding user node: " + user) if VERBOSE else None
-        nodes.append(
+    _preview_sampling = {
+        "nodes": PREVIEW_NODES,
+        "seed": PREVIEW_SEED,
+        "users": [
+            {"user": user, "rows": int(user_rows[user]), "read": int(count)}
+            for user, count in read_rows.sort_index().items()
+        ],
+        "strata": [
             {
-                "id": user,
-                "type": "user",
-                "label": user,
-                "color": PALETTE.mocha.colors.overlay0.hex,
-                "size": 30,
+                "user": user,
+                "category": category,
+                "rows": int(size),
+                "sampled": int(quota),
+                "ratio": round(quota / size * float(read_share[user]), 6),
             }
+            for (user, category), size, quota in zip(strata.index, strata, quotas)
+        ],
+        "genres": {"total": int(len(genre_counts)), "kept": len(top_genres)},
+    }
+    with open(OUTPUT_PATH + "preview.json", "w") as f:
+        json.dump(_preview_sampling, f, indent=2)
+    (
+        print(
+            f"Sampled {len(sampled)} of {len(data)} rows and kept "
+            f"{len(top_genres)} of {len(genre_counts)} genres."
         )
+        if VERBOSE
+        else None
+    )
 
-    # Create labels for tracks
-    print("Creating track labels...") if VERBOSE else None
-    track_labels = {}
-    for spotify_id in spotify_ids:
-        track_data = data[data["Spotify ID"] == spotify_id]
+    return sampled
 
-        # Check if track_data is empty
-        if track_data.empty:
-            (
-                print(
-                    f"Warning: No data found for Spotify ID {spotify_id}. Skipping..."
-                )
-                if VERBOSE
-                else None
+
+def explode_genres(data):
+    # One row per genre in each track's genre list, with the position of the
+    # track in data. Shared by everything in create_nodes_and_edges that needs it.
+    if BUILD_PROCESSES <= 1:
+        genres = data["Genres"].reset_index(drop=True).str.split(",").explode()
+        genres = genres[genres.notna() & (genres != "")]
+        return pd.DataFrame(
+            {"Row": genres.index.to_numpy(dtype=np.int64), "Genre": genres.to_numpy()}
+        )
+
+    # Shard rows by user or by Spotify ID hash, so the same inputs always land
+    # in the same shard
+    if BUILD_SHARD_KEY == "user":
+        keys, _ = pd.factorize(data["user"])
+    else:
+        keys = pd.util.hash_array(data["Spotify ID"].astype(str).to_numpy(dtype=object))
+    shards = keys % BUILD_PROCESSES
+    shard_rows = [np.flatnonzero(shards == shard) for shard in range(BUILD_PROCESSES)]
+
+    memory = genre_shards.share_strings(data["Genres"].tolist())
+    try:
+        with multiprocessing.Pool(BUILD_PROCESSES) as pool:
+            results = pool.starmap(
+                genre_shards.split_genre_shard,
+                [(memory.name, len(data), rows) for rows in shard_rows],
             )
-            track_labels.append("Unknown - Unknown")
-            continue
+    finally:
+        memory.close()
+        memory.unlink()
+
+    # Merge the shards back into row order. Each row lives in one shard, so a
+    # stable sort keeps genres in list order and matches the single process result.
+    rows = np.concatenate([result[0] for result in results])
+    uniques = np.concatenate([result[2] for result in results])
+    offsets = np.cumsum([0] + [len(result[2]) for result in results[:-1]])
+    codes = np.concatenate(
+        [result[1] + offset for result, offset in zip(results, offsets)]
+    )
+    order = np.argsort(rows, kind="stable")
+    return pd.DataFrame({"Row": rows[order], "Genre": uniques[codes[order]]})
 
-        artist = track_data["Artist Name(s)"].iloc[0]
-        track_name = track_data["Track Name"].iloc[0]
-        track_labels[spotify_id] = track_name + "\n" + artist
+
+def build_incidence(row_values, column_codes, column_count):
+    # Binary sparse matrix with a 1 wherever a row value appears with a column code
+    row_codes, row_labels = pd.factorize(row_values)
+    incidence = sp.csr_matrix(
+        (np.ones(len(row_codes)), (row_codes, column_codes)),
+        shape=(len(row_labels), column_count),
+    )
+    incidence.data[:] = 1.0  # duplicate entries are summed on construction
+    return incidence, row_labels
+
+
+def jaccard_matrix(incidence):
+    # Pairwise Jaccard similarity between the rows of a binary incidence matrix
+    intersection = (incidence @ incidence.T).toarray()
+    sizes = np.diag(intersection)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    return np.divide(
+        intersection, union, out=np.zeros_like(intersection), where=union > 0
+    )
+
+
+def compute_user_similarity(data, track_genres):
+    # Blend of Jaccard similarity over each pair of users' track and genre sets
+    users = pd.Index(sorted(data["user"].unique()))
+    user_codes = users.get_indexer(data["user"])
+
+    track_incidence, _ = build_incidence(data["Spotify ID"], user_codes, len(users))
+    genre_incidence, _ = build_incidence(
+        track_genres["Genre"], user_codes[track_genres["Row"]], len(users)
+    )
+
+    # The incidence matrices are item x user, so compare their columns
+    similarity = USER_SIMILARITY_TRACK_WEIGHT * jaccard_matrix(
+        track_incidence.T.tocsr()
+    ) + (1 - USER_SIMILARITY_TRACK_WEIGHT) * jaccard_matrix(genre_incidence.T.tocsr())
+    return pd.DataFrame(similarity, index=users, columns=users)
+
+
+def compute_user_similarity_minhash():
+    # Approximate user similarity, only scoring the pairs LSH puts in a shared bucket
+    users = sorted(_user_signatures.keys())
+    track_signatures = np.array([_user_signatures[user][0] for user in users])
+    genre_signatures = np.array([_user_signatures[user][1] for user in users])
+    first, second = minhash.union_pairs(
+        len(users),
+        minhash.candidate_pairs(track_signatures, MINHASH_BANDS),
+        minhash.candidate_pairs(genre_signatures, MINHASH_BANDS),
+    )
+
+    similarity = USER_SIMILARITY_TRACK_WEIGHT * minhash.estimate_pairs(
+        track_signatures, first, second
+    ) + (1 - USER_SIMILARITY_TRACK_WEIGHT) * minhash.estimate_pairs(
+        genre_signatures, first, second
+    )
+    users = np.array(users, dtype=object)
+    return pd.DataFrame(
+        {"source": users[first], "target": users[second], "similarity": similarity}
+    )
+
+
+def compute_genre_similarity(data, track_genres):
+    # One row per (track, user, genre) using the same genre ids as the genre nodes
+    pairs = data[["Spotify ID", "user"]].iloc[track_genres["Row"]]
+    pairs = pairs.assign(Genre=track_genres["Genre"].to_numpy())
+    genre_codes, genres = pd.factorize(pairs["Genre"])
+
+    # Stack a binary incidence matrix per source (track x genre, user x genre)
+    blocks = []
+    for source in GENRE_SIMILARITY_SOURCES:
+        block, _ = build_incidence(pairs[source], genre_codes, len(genres))
+        blocks.append(block)
+    incidence = sp.vstack(blocks).tocsr()
+
+    # Genre co-occurrence counts from a sparse matrix product
+    occurrences = np.asarray(incidence.sum(axis=0)).ravel()
+    cooccurrence = (incidence.T @ incidence).tocoo()
+    mask = (cooccurrence.row != cooccurrence.col) & (
+        cooccurrence.data >= GENRE_SIMILARITY_MIN_COOCCURRENCE
+    )
+    rows = cooccurrence.row[mask]
+    cols = cooccurrence.col[mask]
+    counts = cooccurrence.data[mask]
+
+    if GENRE_SIMILARITY_METRIC == "jaccard":
+        weights = counts / (occurrences[rows] + occurrences[cols] - counts)
+    elif GENRE_SIMILARITY_METRIC == "cosine":
+        weights = counts / np.sqrt(occurrences[rows] * occurrences[cols])
+    elif GENRE_SIMILARITY_METRIC == "pmi":
+        weights = np.log(
+            counts * incidence.shape[0] / (occurrences[rows] * occurrences[cols])
+        )
+    else:
+        raise ValueError("Unknown genre similarity metric: " + GENRE_SIMILARITY_METRIC)
+
+    positive = weights > 0
+    rows, cols, weights = rows[positive], cols[positive], weights[positive]
+
+    # Keep the top k neighbours of each genre: sort by genre, then by weight
+    order = np.lexsort((-weights, rows))
+    rows, cols, weights = rows[order], cols[order], weights[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+    keep = rank < GENRE_SIMILARITY_TOP_K
+    rows, cols, weights = rows[keep], cols[keep], weights[keep]
+
+    # Each pair may have been kept from both ends, so keep it once
+    low = np.minimum(rows, cols)
+    high = np.maximum(rows, cols)
+    _, unique = np.unique(low.astype(np.int64) * len(genres) + high, return_index=True)
+
+    return [
+        (genres[low[i]], genres[high[i]], float(weights[i])) for i in unique
+    ]
+
+
+def aggregate_tables(data):
+    # Split genre lists into individual genres once, then keep the first
+    # occurrence of each track, and of each genre per user
+    track_genres = explode_genres(data)
+    user_genres = (
+        pd.DataFrame(
+            {
+                "user": data["user"].to_numpy()[track_genres["Row"]],
+                "Genre": track_genres["Genre"].to_numpy(),
+            }
+        )
+        .groupby(["user", "Genre"], sort=False)
+        .size()
+        .reset_index(name="Tracks")
+    )
+    return {
+        "tracks": data.drop_duplicates("Spotify ID"),
+        "track_genres": track_genres,
+        "user_genres": user_genres,
+    }
+
+
+def create_nodes_and_edges(data, tables=None):
+    # Aggregate here unless the DuckDB backend already has
+    if tables is None:
+        tables = aggregate_tables(data)
+
+    # Extract unique users and tracks from dataframe
+    users = data["user"].unique()
+    tracks = tables["tracks"]
+
+    palette = Palette()
+    nodes = NodeTable(palette)
+    edges = EdgeTable(nodes)
 
     # Get list of colors from palette
     print("Creating category colors...") if VERBOSE else None
@@ -251,187 +1299,985 @@ def create_nodes_and_edges(data):
     for color in PALETTE.mocha.colors:
         colors.append(color) if color.accent else None
 
-    # Get list of categories93
+    # Get list of categories
     categories = get_category_list() + ["Unknown"]
 
     # Create palette for categories with len(categories) colors modulated from the palette
     category_colors = [colors[i % len(colors)] for i in range(len(categories))]
+    category_color = {
+        category: category_colors[categories.index(category)]
+        for category in set(categories)
+    }
+    category_hex = {category: color.hex for category, color in category_color.items()}
 
-    # Create nodes and edges for tracks
-    if SHOW_SONGS:
-        print("Creating nodes and edges for tracks...") if VERBOSE else None
-        for spotify_id in spotify_ids:
-            # Get data for track
-            track_data = data[data["Spotify ID"] == spotify_id]
-            label = track_labels[spotify_id]
-            genre = track_data["Primary Genre"].iloc[0]
-            category = track_data["Category"].iloc[0]
-            color = category_colors[categories.index(category)].hex
-            users = track_data["user"].tolist()
-
-            # Create node for track
-            nodes.append(
-                {
-                    "id": spotify_id,
-                    "type": "track",
-                    "label": label,
-                    "genre": genre,
-                    "color": color,
-                    "size": 2,
-                }
-            )
+    track_genres = tables["track_genres"]
+    user_genres = tables["user_genres"]
+    genres = pd.Series(user_genres["Genre"].unique(), dtype=object)
+    genre_categories = genres.map(genre_to_category)
 
-            # Create edges between users and tracks
-            for user in users:
-                edges.append(
-                    {
-                        "source": user,
-                        "target": spotify_id,
-                        "color": PALETTE.mocha.colors.overlay1.hex,
-                        "length": 0.5,
-                    }
-                )
+    # Create nodes for users
+    for user in users:
+        print("Adding user node: " + user) if VERBOSE else None
+    nodes.add(users, users, "user", PALETTE.mocha.colors.overlay0.hex, 30)
+
+    # Create nodes for tracks
+    if SHOW_SONGS:
+        print("Creating nodes for tracks...") if VERBOSE else None
+        nodes.add(
+            tracks["Spotify ID"],
+            tracks["Track Name"] + "\n" + tracks["Artist Name(s)"],
+            "track",
+            tracks["Category"].map(category_hex),
+            2,
+            genres=tracks["Primary Genre"],
+            categories=tracks["Category"],
+        )
 
-    # Create nodes and edges for genres
+    # Create nodes for genres
     if SHOW_GENRES:
-        print("Creating nodes and edges for genres...") if VERBOSE else None
-        # Split genre lists into individual genres, keeping only new ones
-        genres = []
-        for genre_list in data["Genres"].tolist():
-            for genre in genre_list.split(","):
-                category = genre_to_category(genre)
-                if (genre, category) not in genres:
-                    genres.append((genre, category))
-
-        # Print num of genres
+        print("Creating nodes for genres...") if VERBOSE else None
         print("Found " + str(len(genres)) + " unique genres.") if VERBOSE else None
+        nodes.add(
+            genres,
+            genres,
+            "genre",
+            genre_categories.map(category_hex),
+            5,
+            categories=genre_categories,
+        )
 
-        # Create nodes for genres
-        for genre in genres:
-            # Get category from category-genre mapping
-            label = genre[0]
-            category = genre[1]
-            color = category_colors[categories.index(category)].hex
-            nodes.append(
-                {
-                    "id": label,
-                    "type": "genre",
-                    "label": label,
-                    "color": color,
-                    "size": 5,
-                }
-            )
+    # Create nodes for categories
+    if SHOW_CATEGORIES:
+        print("Creating nodes for categories...") if VERBOSE else None
+        unique_categories = pd.unique(pd.Series(categories, dtype=object))
+        nodes.add(
+            unique_categories,
+            unique_categories,
+            "category",
+            [category_hex[category] for category in unique_categories],
+            10,
+            categories=unique_categories,
+        )
 
+    # Create edges between users and tracks
+    if SHOW_SONGS:
+        print("Creating edges for tracks...") if VERBOSE else None
+        edges.add(data["user"], data["Spotify ID"], PALETTE.mocha.colors.overlay1.hex)
+
+    if SHOW_GENRES:
+        print("Creating edges for genres...") if VERBOSE else None
         if SHOW_SONGS:
-            # Create edges between tracks and genres
-            for spotify_id in spotify_ids:
-                track_data = data[data["Spotify ID"] == spotify_id]
-                genre = track_data["Category"].iloc[0]
-                category = genre_to_category(genre)
-                color = category_colors[categories.index(category)].hex
-                edges.append(
-                    {
-                        "source": spotify_id,
-                        "target": genre,
-                        "color": color,
-                    }
-                )
+            # Create edges between tracks and their categories, weighted by the
+            # share of the track's genres that voted for each category
+            share_columns = [c for c in data.columns if c.startswith(SHARE_PREFIX)]
+            track_shares = tracks.set_index("Spotify ID")[share_columns].stack()
+            track_shares = track_shares[track_shares > 0]
+            share_categories = (
+                track_shares.index.get_level_values(1).str[len(SHARE_PREFIX) :]
+            )
+            edges.add(
+                track_shares.index.get_level_values(0),
+                share_categories,
+                share_categories.map(category_hex),
+                track_shares.to_numpy(),
+            )
 
-        # Create edges for genre > user connections
-        for user in users:
-            user_data = data[data["user"] == user]
-            user_genres = []
-            for genre_list in user_data["Genres"].tolist():
-                for g in genre_list.split(","):
-                    if g not in user_genres:
-                        user_genres.append(g)
-
-            for genre in user_genres:
-                category = genre_to_category(genre)
-                color = alter_rgb(category_colors[categories.index(category)].rgb, 1.5)
-                edges.append(
-                    {
-                        "source": user,
-                        "target": genre,
-                        "color": color,
-                    }
-                )
+        # Create edges for genre > user connections, weighted by how many of the
+        # user's tracks have the genre relative to their most common genre
+        user_genre_colors = {
+            category: alter_rgb(color.rgb, 1.5)
+            for category, color in category_color.items()
+        }
+        edges.add(
+            user_genres["user"],
+            user_genres["Genre"],
+            user_genres["Genre"].map(genre_to_category).map(user_genre_colors),
+            (
+                user_genres["Tracks"]
+                / user_genres.groupby("user")["Tracks"].transform("max")
+            ).to_numpy(),
+        )
 
-    # Create nodes and edges for categories
-    if SHOW_CATEGORIES:
-        print("Creating nodes and edges for categories...") if VERBOSE else None
-        for category in categories:
-            color = category_colors[categories.index(category)].hex
-            nodes.append(
+        # Create edges between genres that often appear together
+        if SHOW_GENRE_SIMILARITY:
+            print("Computing genre similarity...") if VERBOSE else None
+            similar_genres = compute_genre_similarity(data, track_genres)
+            added = edges.add(
+                [genre_a for genre_a, _, _ in similar_genres],
+                [genre_b for _, genre_b, _ in similar_genres],
+                PALETTE.mocha.colors.surface2.hex,
+                [weight for _, _, weight in similar_genres],
+            )
+            (
+                print("Added " + str(added) + " genre similarity edges.")
+                if VERBOSE
+                else None
+            )
+
+    # Create edges between genres and categories
+    if SHOW_CATEGORIES and SHOW_GENRES:
+        print("Creating edges for categories...") if VERBOSE else None
+        genre_category_colors = {
+            category: alter_rgb(color.rgb, 0.5)
+            for category, color in category_color.items()
+        }
+        edges.add(genres, genre_categories, genre_categories.map(genre_category_colors))
+
+    # Create edges between users with similar taste
+    if SHOW_USER_SIMILARITY and len(users) > 1:
+        print("Computing user similarity...") if VERBOSE else None
+        if USER_SIMILARITY_MODE == "minhash":
+            user_pairs = compute_user_similarity_minhash()
+            user_pairs.to_csv(OUTPUT_PATH + "user_similarity_pairs.csv", index=False)
+        else:
+            user_similarity = compute_user_similarity(data, track_genres)
+            user_similarity.to_csv(OUTPUT_PATH + "user_similarity.csv")
+            first, second = np.triu_indices(len(user_similarity), k=1)
+            user_pairs = pd.DataFrame(
                 {
-                    "id": category,
-                    "type": "category",
-                    "label": category,
-                    "color": color,
-                    "size": 10,
+                    "source": user_similarity.index[first],
+                    "target": user_similarity.index[second],
+                    "similarity": user_similarity.to_numpy()[first, second],
                 }
             )
 
-        if SHOW_GENRES:
-            # Create edges between genres and categories
-            for genre in genres:
-                label = genre[0]
-                category = genre[1]
-                color = alter_rgb(category_colors[categories.index(category)].rgb, 0.5)
+        user_pairs = user_pairs[user_pairs["similarity"] >= USER_SIMILARITY_MIN]
+        edges.add(
+            user_pairs["source"],
+            user_pairs["target"],
+            PALETTE.mocha.colors.overlay2.hex,
+            user_pairs["similarity"].to_numpy(),
+        )
+
+    # The graph is undirected, so repeated pairs collapse into one edge
+    edges.deduplicate()
 
-                edges.append({"source": label, "target": category, "color": color})
+    (
+        print(
+            "Created " + str(len(nodes)) + " nodes and " + str(len(edges)) + " edges."
+        )
+        if VERBOSE
+        else None
+    )
+
+    return nodes, edges
+
+
+def row_argmax(matrix):
+    # Column of the largest entry in each row of a CSR matrix (first one on ties),
+    # or -1 for empty rows. Vectorized, unlike scipy's per-row argmax.
+    lengths = np.diff(matrix.indptr)
+    filled = lengths > 0
+    result = np.full(matrix.shape[0], -1, dtype=np.int64)
+    if not filled.any():
+        return result
+    maxima = np.maximum.reduceat(matrix.data, matrix.indptr[:-1][filled])
+    row_of = np.repeat(np.arange(matrix.shape[0]), lengths)
+    hits = np.flatnonzero(matrix.data == np.repeat(maxima, lengths[filled]))
+    rows, first = np.unique(row_of[hits], return_index=True)
+    result[rows] = matrix.indices[hits[first]]
+    return result
+
+
+def detect_communities(nodes, edges):
+    # Weighted label propagation over a sparse adjacency representation.
+    # Only a random half of the nodes is updated each round, which stops the
+    # labels oscillating across the mostly bipartite user/track/genre graph.
+    print("Detecting communities...") if VERBOSE else None
+    count = len(nodes)
+
+    # Both directions of every edge, plus a tiny self vote so ties keep the current label
+    loops = np.arange(count)
+    rows = np.concatenate([edges.source, edges.target, loops])
+    cols = np.concatenate([edges.target, edges.source, loops])
+    weights = np.concatenate([edges.weight, edges.weight, np.full(count, 1e-6)])
+
+    rng = np.random.default_rng(42)
+    labels = np.arange(count)
+    for iteration in range(COMMUNITY_MAX_ITERATIONS):
+        # Sum the weight each node receives from every neighbouring label
+        votes = sp.csr_matrix((weights, (rows, labels[cols])), shape=(count, count))
+        best = row_argmax(votes)
+
+        update = (rng.random(count) < 0.5) & (best != labels)
+        labels[update] = best[update]
+        if update.sum() <= COMMUNITY_TOLERANCE * count:
+            break
+
+    # Number communities from largest to smallest
+    _, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+    nodes.community = rank[inverse].astype(np.int32)
+
+    if COLOR_BY_COMMUNITY:
+        community_colors = [c.hex for c in PALETTE.mocha.colors if c.accent]
+        nodes.color = nodes.palette.intern(
+            np.array(community_colors, dtype=object)[
+                nodes.community % len(community_colors)
+            ],
+            count,
+        )
+
+    (
+        print(
+            "Found "
+            + str(len(sizes))
+            + " communities after "
+            + str(iteration + 1)
+            + " rounds."
+        )
+        if VERBOSE
+        else None
+    )
+    return nodes
+
+
+def pagerank(sources, targets, weights, count, damping=0.85, tolerance=1e-8):
+    # Power iteration over the symmetric weighted adjacency matrix
+    adjacency = sp.csr_matrix(
+        (
+            np.concatenate([weights, weights]),
+            (np.concatenate([sources, targets]), np.concatenate([targets, sources])),
+        ),
+        shape=(count, count),
+    )
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse = np.divide(1.0, out_weight, out=np.zeros(count), where=~dangling)
+
+    rank = np.full(count, 1.0 / count)
+    for _ in range(100):
+        spread = adjacency.T @ (rank * inverse)
+        updated = damping * (spread + rank[dangling].sum() / count) + (1 - damping) / count
+        if np.abs(updated - rank).sum() < tolerance:
+            return updated
+        rank = updated
+    return rank
+
+
+def size_nodes_by_centrality(nodes, edges):
+    # Scale node sizes by a centrality metric, relative to the other nodes of the
+    # same type, and write every metric to a stats file
+    print("Computing node centrality...") if VERBOSE else None
+    count = len(nodes)
+    endpoints = np.concatenate([edges.source, edges.target])
+
+    stats = pd.DataFrame(index=nodes.index)
+    stats["type"] = nodes.types()
+    stats["degree"] = np.bincount(endpoints, minlength=count)
+    stats["weighted_degree"] = np.bincount(
+        endpoints, weights=np.concatenate([edges.weight, edges.weight]), minlength=count
+    )
+    stats["pagerank"] = pagerank(edges.source, edges.target, edges.weight, count)
+
+    # Betweenness is estimated from a sample of source nodes
+    if CENTRALITY_METRIC == "betweenness" or BETWEENNESS_SAMPLES > 0:
+        G = nx.Graph()
+        G.add_nodes_from(range(count))
+        G.add_edges_from(zip(edges.source.tolist(), edges.target.tolist()))
+        samples = min(BETWEENNESS_SAMPLES or 100, count)
+        betweenness = nx.betweenness_centrality(G, k=samples, seed=42)
+        stats["betweenness"] = [betweenness[i] for i in range(count)]
+
+    stats.to_csv(OUTPUT_PATH + "node_stats.csv", index_label="id")
+
+    # Transform, then normalize within each node type
+    values = stats[CENTRALITY_METRIC].to_numpy(dtype=np.float64)
+    if CENTRALITY_SCALING == "sqrt":
+        values = np.sqrt(values)
+    elif CENTRALITY_SCALING == "log":
+        values = np.log1p(values)
+    maxima = np.zeros(len(NODE_TYPES))
+    np.maximum.at(maxima, nodes.type, values)
+    relative = values / np.where(maxima > 0, maxima, 1.0)[nodes.type]
+    nodes.size = nodes.size * (1 + (CENTRALITY_SIZE_RANGE - 1) * relative)
+
+    print("Node stats written to file.") if VERBOSE else None
+    return nodes
+
+
+def relation_rows(nodes, edges, first, second):
+    # Rows of the edges between two node types, in either direction
+    first, second = NODE_TYPES.index(first), NODE_TYPES.index(second)
+    source = nodes.type[edges.source]
+    target = nodes.type[edges.target]
+    return np.flatnonzero(
+        ((source == first) & (target == second))
+        | ((source == second) & (target == first))
+    )
+
+
+def disparity_alpha(endpoint, weight, count):
+    # Disparity filter p-value of each edge from one endpoint's side: the chance
+    # of a share this large if the endpoint's strength were split uniformly at
+    # random over its k edges. Edges of nodes with a single edge are always kept.
+    strength = np.bincount(endpoint, weights=weight, minlength=count)
+    degree = np.bincount(endpoint, minlength=count)[endpoint]
+    share = np.divide(
+        weight,
+        strength[endpoint],
+        out=np.zeros(len(weight)),
+        where=strength[endpoint] > 0,
+    )
+    return np.where(degree > 1, (1 - share) ** (degree - 1), 0.0)
+
+
+def top_k_edges(endpoint, weight, k):
+    # Whether each edge is one of the k heaviest of its endpoint, ties going to
+    # the edge added first
+    order = np.lexsort((np.arange(len(weight)), -weight, endpoint))
+    sorted_endpoint = endpoint[order]
+    rank = np.empty(len(weight), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - np.searchsorted(
+        sorted_endpoint, sorted_endpoint
+    )
+    return rank < k
+
+
+def extract_backbone(nodes, edges):
+    # Prune the relations in BACKBONE_RELATIONS to their backbone. An edge is kept
+    # when it is significant under the disparity filter, or among the heaviest
+    # BACKBONE_TOP_K edges, for either of its endpoints. Each relation is filtered
+    # on its own, since weights of different relations are not comparable.
+    keep = np.ones(len(edges), dtype=bool)
+    for first, second in BACKBONE_RELATIONS:
+        rows = relation_rows(nodes, edges, first, second)
+        weight = edges.weight[rows]
+        kept = np.zeros(len(rows), dtype=bool)
+        for endpoint in (edges.source[rows], edges.target[rows]):
+            if BACKBONE_ALPHA > 0:
+                kept |= disparity_alpha(endpoint, weight, len(nodes)) < BACKBONE_ALPHA
+            if BACKBONE_TOP_K > 0:
+                kept |= top_k_edges(endpoint, weight, BACKBONE_TOP_K)
+        keep[rows] = kept
+        (
+            print(f"{first} > {second}: kept {int(kept.sum())} of {len(rows)} edges.")
+            if VERBOSE
+            else None
+        )
+
+    edges.select(keep)
+    (
+        print(f"Kept {int(keep.sum())} edges and removed {int((~keep).sum())}.")
+        if VERBOSE
+        else None
+    )
+    return edges
+
+
+def needs_layout(data):
+    # Whether any output of this run draws on the static layout
+    return (
+        (EXPORT_GRAPH and EXPORT_LAYOUT)
+        or (WRITE_TIMELINE and "Added At" in data.columns)
+        or WRITE_SNAPSHOT
+        or PROGRESSIVE_LOADING
+    )
+
+
+def compute_layout(nodes, edges):
+    # Lay out user, genre and category nodes with a spring layout, then place
+    # each track next to the centroid of its neighbours. Tracks are the bulk of
+    # the graph, so they never go through the force simulation.
+    print("Computing static layout...") if VERBOSE else None
+    count = len(nodes)
+    track = nodes.type_mask("track")
+    static = ~track
+
+    skeleton = nx.Graph()
+    skeleton.add_nodes_from(np.flatnonzero(static).tolist())
+    both_static = static[edges.source] & static[edges.target]
+    skeleton.add_edges_from(
+        zip(edges.source[both_static].tolist(), edges.target[both_static].tolist())
+    )
+
+    # Start each community around its own point on a circle when known
+    initial = None
+    if (nodes.community[static] >= 0).any():
+        rows = np.flatnonzero(static)
+        angles = 2 * np.pi * nodes.community[rows] / (nodes.community.max() + 1)
+        jitter = np.random.default_rng(42).normal(scale=0.1, size=(len(rows), 2))
+        starts = np.column_stack([np.cos(angles), np.sin(angles)]) + jitter
+        initial = dict(zip(rows.tolist(), starts))
+
+    positions = np.zeros((count, 2))
+    if len(skeleton) > 0:
+        layout = nx.spring_layout(skeleton, pos=initial, seed=42, scale=LAYOUT_SCALE)
+        positions[list(layout.keys())] = np.array(list(layout.values()))
+
+    # Anchor each track to one static neighbour: a genre when it has one, then
+    # a category, then a user. Among those, the one with the fewest tracks, which
+    # is the most specific and keeps the big hubs from drawing every track in.
+    near = np.concatenate([edges.source, edges.target])
+    far = np.concatenate([edges.target, edges.source])
+    linked = track[near] & static[far]
+    near, far = near[linked], far[linked]
+    priority = np.select(
+        [nodes.type_mask("genre")[far], nodes.type_mask("category")[far]], [0, 1], 2
+    )
+    load = np.bincount(far, minlength=count)[far]
+    order = np.lexsort((far, load, priority, near))
+    tracks, first = np.unique(near[order], return_index=True)
+    anchor = np.full(count, -1, dtype=np.int64)
+    anchor[tracks] = far[order][first]
+
+    # Tracks sharing an anchor go on a sunflower spiral around it, so the area
+    # they cover grows with their number instead of piling up in one spot
+    rows = np.flatnonzero(track)
+    seeds = pd.util.hash_array(np.array(nodes.ids, dtype=object)[rows])
+    by_anchor = np.lexsort((seeds, anchor[rows]))
+    grouped = anchor[rows][by_anchor]
+    starts = np.r_[True, grouped[1:] != grouped[:-1]]
+    rank = np.empty(len(rows), dtype=np.int64)
+    rank[by_anchor] = np.arange(len(rows)) - np.maximum.accumulate(
+        np.where(starts, np.arange(len(rows)), 0)
+    )
+    radius = TRACK_SPACING * np.sqrt(rank + 1)
+    angle = rank * np.pi * (3 - np.sqrt(5)) + anchor[rows] % 360 * np.pi / 180
+    centre = np.where(anchor[rows, None] >= 0, positions[anchor[rows]], 0.0)
+    positions[rows] = centre + np.column_stack(
+        [radius * np.cos(angle), radius * np.sin(angle)]
+    )
+
+    return positions
+
+
+def quadtree_tiles(points, capacity):
+    # Split the square around the points into quadrants until none holds more
+    # than capacity points, so dense areas get small tiles and sparse ones large.
+    # Returns (key, bounds, rows) per non-empty tile, keyed by quadrant path.
+    low = points.min(axis=0)
+    side = max(float((points.max(axis=0) - low).max()), 1.0)
+    tiles = []
+    stack = [("q", low[0], low[1], side, np.arange(len(points)))]
+    while stack:
+        key, x, y, side, rows = stack.pop()
+        if len(rows) <= capacity or side < 1.0:
+            tiles.append((key, [x, y, x + side, y + side], rows))
+            continue
+        half = side / 2
+        right = points[rows, 0] >= x + half
+        below = points[rows, 1] >= y + half
+        for quadrant in range(4):
+            inside = (right == bool(quadrant & 1)) & (below == bool(quadrant & 2))
+            if inside.any():
+                stack.append(
+                    (
+                        key + str(quadrant),
+                        x + half * (quadrant & 1),
+                        y + half * (quadrant >> 1),
+                        half,
+                        rows[inside],
+                    )
+                )
+    return sorted(tiles, key=lambda tile: tile[0])
+
+
+def write_tiles(nodes, edges, positions):
+    # Bucket track nodes, and every edge touching a track, into quadtree tiles of
+    # at most TILE_CAPACITY tracks. Each tile is a small script that hands its
+    # payload to tileLoaded(), so the page can pull tiles in with <script> tags
+    # even when opened from disk.
+    tile_path = OUTPUT_PATH + "tiles/"
+    os.makedirs(tile_path, exist_ok=True)
+    for stale in glob.glob(tile_path + "tile_*.js"):
+        os.remove(stale)
+
+    track = nodes.type_mask("track")
+    track_rows = np.flatnonzero(track)
+    tiles = (
+        quadtree_tiles(positions[track_rows], TILE_CAPACITY) if len(track_rows) else []
+    )
+    tile_of = np.full(len(nodes), -1, dtype=np.int64)
+    for number, (_, _, rows) in enumerate(tiles):
+        tile_of[track_rows[rows]] = number
+
+    track_end = np.where(track[edges.source], edges.source, edges.target)
+    edge_groups = pd.Series(np.arange(len(edges))).groupby(tile_of[track_end]).indices
+    for number, (key, _, rows) in enumerate(tiles):
+        edge_rows = edge_groups.get(number, np.empty(0, dtype=np.int64))
+        with open(tile_path + "tile_" + key + ".js", "w") as f:
+            f.write(
+                f"tileLoaded({json.dumps(key)}, "
+                + '{"nodes": '
+                + node_records_json(nodes, track_rows[rows], positions)
+                + ', "edges": '
+                + edge_records_json(edges, edge_rows)
+                + "});\n"
+            )
+
+    print("Wrote " + str(len(tiles)) + " track tiles.") if VERBOSE else None
+
+    # The page opens fitted to the user, genre and category nodes. Tiles only load
+    # once zoomed TILE_MIN_ZOOM times past that, so the opening view stays light.
+    skeleton = positions[~track]
+    extent = float(np.ptp(skeleton, axis=0).max()) if len(skeleton) else 0.0
+    fit_scale = min(CANVAS_SIZE / max(extent, 1.0), 1.0)
+
+    return {
+        "path": "tiles/",
+        "minScale": fit_scale * TILE_MIN_ZOOM,
+        "tiles": [
+            {"key": key, "bounds": [round(float(value), 2) for value in bounds]}
+            for key, bounds, _ in tiles
+        ],
+    }
+
+
+def frame_delta(previous, current):
+    # Rows added, removed, or changed in any column between two frames indexed by id
+    added = current.index.difference(previous.index)
+    removed = previous.index.difference(current.index)
+    common = current.index.intersection(previous.index)
+
+    columns = current.columns.union(previous.columns)
+    before = previous.reindex(index=common, columns=columns)
+    after = current.reindex(index=common, columns=columns)
+    same = (before == after) | (before.isna() & after.isna())
+    changed = common[~same.all(axis=1)]
+
+    return {
+        "add": json.loads(current.loc[added].reset_index().to_json(orient="records")),
+        "update": json.loads(
+            current.loc[changed].reset_index().to_json(orient="records")
+        ),
+        "remove": removed.tolist(),
+    }
+
+
+def write_graph_delta(nodes, edges):
+    # Compare this run's graph with the previous run's and write the difference
+    # as a patch that lib/bindings/delta.js can apply to an open page
+    state_path = OUTPUT_PATH + "graph_state.pkl"
+    delta_path = OUTPUT_PATH + "network_delta.json"
+    node_frame = nodes.to_frame().set_index("id")
+    edge_frame = (
+        edges.to_frame()
+        .rename(columns={"source": "from", "target": "to", "weight": "width"})
+        .set_index("id")
+    )
+
+    if os.path.exists(state_path):
+        previous_nodes, previous_edges = pd.read_pickle(state_path)
+        delta = {
+            "nodes": frame_delta(previous_nodes, node_frame),
+            "edges": frame_delta(previous_edges, edge_frame),
+        }
+        with open(delta_path, "w") as f:
+            json.dump(delta, f)
 
         (
             print(
-                "Created "
-                + str(len(nodes))
-                + " nodes and "
-                + str(len(edges))
-                + " edges."
+                "Graph delta: "
+                + ", ".join(
+                    f"{len(delta[part][change])} {part} {change}"
+                    for part in ("nodes", "edges")
+                    for change in ("add", "update", "remove")
+                )
             )
             if VERBOSE
             else None
         )
+    else:
+        # A delta left from an older graph would not apply to this one
+        if os.path.exists(delta_path):
+            os.remove(delta_path)
+        print("No previous graph found, skipping delta.") if VERBOSE else None
+
+    pd.to_pickle((node_frame, edge_frame), state_path)
+
+
+def first_periods(nodes, edges, data):
+    # Index of the period in which each node and edge first appears, and the
+    # sorted period labels. Rows without a timestamp count from the first period.
+    added = pd.to_datetime(data["Added At"], utc=True, errors="coerce")
+    row_periods = added.dt.tz_localize(None).dt.to_period(TIMELINE_PERIOD)
+    row_codes, periods = pd.factorize(row_periods, sort=True)
+    row_codes = np.maximum(row_codes, 0)
+    unset = len(periods)
+
+    def earliest(node_ids, codes):
+        rows = nodes.rows(node_ids)
+        found = rows >= 0
+        np.minimum.at(node_time, rows[found], codes[found])
+
+    # Nodes appear with the first track that brings them in
+    node_time = np.full(len(nodes), unset, dtype=np.int64)
+    track_genres = explode_genres(data)
+    genre_codes = row_codes[track_genres["Row"].to_numpy()]
+    earliest(data["user"], row_codes)
+    earliest(data["Spotify ID"], row_codes)
+    earliest(data["Category"], row_codes)
+    earliest(track_genres["Genre"], genre_codes)
+
+    # Anything else (such as categories only reached through genres) appears
+    # with its earliest neighbour
+    for _ in range(2):
+        neighbour_time = np.full(len(nodes), unset, dtype=np.int64)
+        np.minimum.at(neighbour_time, edges.source, node_time[edges.target])
+        np.minimum.at(neighbour_time, edges.target, node_time[edges.source])
+        node_time = np.where(node_time == unset, neighbour_time, node_time)
+    node_time[node_time == unset] = 0
+
+    # Edges appear with their later endpoint, except that a user is linked to a
+    # track or genre when they added it, not when someone else first did
+    edge_time = np.maximum(node_time[edges.source], node_time[edges.target])
+    low = np.minimum(edges.source, edges.target)
+    high = np.maximum(edges.source, edges.target)
+    edge_keys = pd.Index(low * len(nodes) + high)
+    users = nodes.rows(data["user"])
+    genre_rows = track_genres["Row"].to_numpy()
+    pairs = [
+        (users, nodes.rows(data["Spotify ID"]), row_codes),
+        (users[genre_rows], nodes.rows(track_genres["Genre"]), genre_codes),
+    ]
+    for sources, targets, codes in pairs:
+        found = (sources >= 0) & (targets >= 0)
+        pair_keys = np.minimum(sources, targets) * len(nodes) + np.maximum(
+            sources, targets
+        )
+        pair_time = pd.Series(codes[found]).groupby(pair_keys[found]).min()
+        positions = edge_keys.get_indexer(pair_time.index)
+        edge_time[positions[positions >= 0]] = pair_time.to_numpy()[positions >= 0]
+
+    return node_time, edge_time, periods.astype(str).tolist()
 
-    return nodes, edges
 
+def write_timeline(nodes, edges, data, positions):
+    # Cumulative snapshots per period, stored as the nodes and edges each period
+    # adds to the one before. Nodes carry fixed positions so the page can step
+    # through the frames without running physics.
+    if "Added At" not in data.columns:
+        print("No \"Added At\" column found, skipping timeline.") if VERBOSE else None
+        return
 
-def visualize_network(nodes, edges):
-    # Create a new graph
-    G = nx.Graph()
-    print("Graph created.") if VERBOSE else None
+    node_time, edge_time, periods = first_periods(nodes, edges, data)
+    frames = []
+    for period in range(len(periods)):
+        node_rows = np.flatnonzero(node_time == period)
+        edge_rows = np.flatnonzero(edge_time == period)
+        frames.append(
+            '{"nodes": '
+            + node_records_json(nodes, node_rows, positions)
+            + ', "edges": '
+            + edge_records_json(edges, edge_rows)
+            + "}"
+        )
 
-    # Add nodes and edges to the graph
-    print("Adding nodes and edges to graph...") if VERBOSE else None
-    for node in nodes:
-        G.add_node(
-            node["id"],
-            label=node["label"],
-            type=node["type"],
-            size=node["size"],
-            color=node["color"],
+    with open(OUTPUT_PATH + "timeline.js", "w") as f:
+        f.write(
+            "timelineLoaded({"
+            + '"periods": '
+            + json.dumps(periods)
+            + ', "frames": ['
+            + ",\n".join(frames)
+            + "]});\n"
         )
+    (
+        print(f"Wrote {len(periods)} timeline frames to {OUTPUT_PATH}timeline.js")
+        if VERBOSE
+        else None
+    )
 
-    for edge in edges:
-        G.add_edge(edge["source"], edge["target"], color=edge["color"])
+
+def parse_color(color):
+    # (r, g, b) of a "#rrggbb" or "rgb(r,g,b)" color, clipped to 0-255
+    if color.startswith("#"):
+        return tuple(int(color[i : i + 2], 16) for i in (1, 3, 5))
+    values = color[color.index("(") + 1 : color.index(")")].split(",")
+    return tuple(min(max(int(round(float(value))), 0), 255) for value in values)
+
+
+def export_chunks(count):
+    for start in range(0, count, EXPORT_CHUNK_SIZE):
+        yield np.arange(start, min(start + EXPORT_CHUNK_SIZE, count))
+
+
+def export_node_arrays(nodes):
+    # Full-length node columns, built once per export and sliced for each chunk
+    return {
+        "id": np.array(nodes.ids, dtype=object),
+        "label": np.array(nodes.labels, dtype=object),
+        "type": nodes.types(),
+        "genre": np.array(nodes.genres, dtype=object),
+        "category": np.array(nodes.categories, dtype=object),
+    }
+
+
+def export_node_columns(nodes, arrays, rows, positions):
+    # Attribute columns for a chunk of nodes, shared by both formats. Text is
+    # converted to str, with None where a node has no value.
+    def text(values):
+        return [None if value is None else str(value) for value in values[rows]]
+
+    columns = {
+        "id": text(arrays["id"]),
+        "label": text(arrays["label"]),
+        "type": arrays["type"][rows],
+        "genre": text(arrays["genre"]),
+        "category": text(arrays["category"]),
+        "color": nodes.color[rows],
+        "size": nodes.size[rows],
+        "community": nodes.community[rows],
+    }
+    if positions is not None:
+        columns["x"] = positions[rows, 0]
+        columns["y"] = positions[rows, 1]
+    return columns
+
+
+def export_ids(nodes):
+    # Node ids quoted for use as XML attribute values, indexed by node row
+    return np.array([quoteattr(str(value)) for value in nodes.ids], dtype=object)
+
+
+def write_gexf(nodes, edges, path, positions=None):
+    # GEXF 1.3 written a chunk at a time straight from the tables, with colors,
+    # sizes and positions in the viz namespace Gephi reads
+    rgb = [parse_color(color) for color in nodes.palette.colors]
+    attributes = ["type", "genre", "category", "community"]
+    with gzip.open(
+        path, "wt", encoding="utf-8", compresslevel=EXPORT_COMPRESSION
+    ) as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<gexf xmlns="http://gexf.net/1.3" xmlns:viz="http://gexf.net/1.3/viz"'
+            ' version="1.3">\n'
+            '  <graph defaultedgetype="undirected" mode="static">\n'
+            '    <attributes class="node">\n'
+        )
+        for i, name in enumerate(attributes):
+            kind = "integer" if name == "community" else "string"
+            f.write(f'      <attribute id="{i}" title="{name}" type="{kind}"/>\n')
+        f.write("    </attributes>\n    <nodes>\n")
+
+        arrays = export_node_arrays(nodes)
+        for rows in export_chunks(len(nodes)):
+            columns = export_node_columns(nodes, arrays, rows, positions)
+            lines = []
+            for i in range(len(rows)):
+                values = [
+                    columns["type"][i],
+                    columns["genre"][i],
+                    columns["category"][i],
+                    columns["community"][i] if columns["community"][i] >= 0 else None,
+                ]
+                r, g, b = rgb[columns["color"][i]]
+                lines.append(
+                    f'      <node id={quoteattr(columns["id"][i])}'
+                    f' label={quoteattr(columns["label"][i])}>'
+                    "<attvalues>"
+                    + "".join(
+                        f'<attvalue for="{j}" value={quoteattr(str(value))}/>'
+                        for j, value in enumerate(values)
+                        if value is not None
+                    )
+                    + "</attvalues>"
+                    f'<viz:color r="{r}" g="{g}" b="{b}"/>'
+                    f'<viz:size value="{columns["size"][i]}"/>'
+                    + (
+                        f'<viz:position x="{columns["x"][i]}" y="{columns["y"][i]}"'
+                        ' z="0.0"/>'
+                        if positions is not None
+                        else ""
+                    )
+                    + "</node>\n"
+                )
+            f.write("".join(lines))
+
+        f.write("    </nodes>\n    <edges>\n")
+        # Ids are quoted once per node rather than once per edge endpoint
+        ids = export_ids(nodes)
+        for rows in export_chunks(len(edges)):
+            sources = ids[edges.source[rows]]
+            targets = ids[edges.target[rows]]
+            weights = edges.weight[rows].tolist()
+            lines = []
+            for i, row in enumerate(rows.tolist()):
+                r, g, b = rgb[edges.color[row]]
+                lines.append(
+                    f'      <edge id="{row}" source={sources[i]} target={targets[i]}'
+                    f' weight="{weights[i]}">'
+                    f'<viz:color r="{r}" g="{g}" b="{b}"/></edge>\n'
+                )
+            f.write("".join(lines))
+        f.write("    </edges>\n  </graph>\n</gexf>\n")
+
+
+def write_graphml(nodes, edges, path, positions=None):
+    # GraphML written a chunk at a time straight from the tables. Cytoscape
+    # picks the data keys up as node and edge table columns.
+    keys = [
+        ("label", "node", "string"),
+        ("type", "node", "string"),
+        ("genre", "node", "string"),
+        ("category", "node", "string"),
+        ("community", "node", "int"),
+        ("color", "node", "string"),
+        ("size", "node", "double"),
+        ("x", "node", "double"),
+        ("y", "node", "double"),
+        ("color", "edge", "string"),
+        ("weight", "edge", "double"),
+    ]
+    with gzip.open(
+        path, "wt", encoding="utf-8", compresslevel=EXPORT_COMPRESSION
+    ) as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        )
+        for name, domain, kind in keys:
+            if name in ("x", "y") and positions is None:
+                continue
+            f.write(
+                f'  <key id="{domain[0]}_{name}" for="{domain}"'
+                f' attr.name="{name}" attr.type="{kind}"/>\n'
+            )
+        f.write('  <graph id="G" edgedefault="undirected">\n')
+
+        colors = [escape(color) for color in nodes.palette.colors]
+        arrays = export_node_arrays(nodes)
+        for rows in export_chunks(len(nodes)):
+            columns = export_node_columns(nodes, arrays, rows, positions)
+            lines = []
+            for i in range(len(rows)):
+                values = {
+                    "label": escape(columns["label"][i]),
+                    "type": columns["type"][i],
+                    "genre": columns["genre"][i] and escape(columns["genre"][i]),
+                    "category": (
+                        columns["category"][i] and escape(columns["category"][i])
+                    ),
+                    "community": (
+                        columns["community"][i] if columns["community"][i] >= 0 else None
+                    ),
+                    "color": colors[columns["color"][i]],
+                    "size": columns["size"][i],
+                }
+                if positions is not None:
+                    values["x"] = columns["x"][i]
+                    values["y"] = columns["y"][i]
+                lines.append(
+                    f'    <node id={quoteattr(columns["id"][i])}>'
+                    + "".join(
+                        f'<data key="n_{name}">{value}</data>'
+                        for name, value in values.items()
+                        if value is not None
+                    )
+                    + "</node>\n"
+                )
+            f.write("".join(lines))
+
+        ids = export_ids(nodes)
+        for rows in export_chunks(len(edges)):
+            sources = ids[edges.source[rows]]
+            targets = ids[edges.target[rows]]
+            weights = edges.weight[rows].tolist()
+            lines = []
+            for i, row in enumerate(rows.tolist()):
+                lines.append(
+                    f"    <edge source={sources[i]} target={targets[i]}>"
+                    f'<data key="e_color">{colors[edges.color[row]]}</data>'
+                    f'<data key="e_weight">{weights[i]}</data></edge>\n'
+                )
+            f.write("".join(lines))
+        f.write("  </graph>\n</graphml>\n")
+
+
+def export_graph(nodes, edges, positions=None):
+    positions = positions if EXPORT_LAYOUT else None
+    writers = {"gexf": write_gexf, "graphml": write_graphml}
+    for export_format in EXPORT_FORMATS:
+        path = OUTPUT_PATH + "network." + export_format + ".gz"
+        print("Writing " + path + "...") if VERBOSE else None
+        writers[export_format](nodes, edges, path, positions)
+
+
+def write_snapshot(nodes, edges, positions):
+    # Draw the static layout straight to image files, largest nodes on top
+    order = np.argsort(nodes.size, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    rgb = np.array([parse_color(color) for color in nodes.palette.colors])
+    renderers = {"png": snapshot.render_png, "svg": snapshot.render_svg}
+    for snapshot_format in SNAPSHOT_FORMATS:
+        path = OUTPUT_PATH + "network." + snapshot_format
+        print("Drawing " + path + "...") if VERBOSE else None
+        renderers[snapshot_format](
+            path,
+            positions[order],
+            rgb[nodes.color[order]],
+            nodes.size[order] * SNAPSHOT_HEIGHT / 2000,
+            rank[edges.source],
+            rank[edges.target],
+            rgb[edges.color],
+            SNAPSHOT_WIDTH,
+            SNAPSHOT_HEIGHT,
+            parse_color(PALETTE.mocha.colors.mantle.hex),
+        )
+
+
+def inject_scripts(html, scripts):
+    # Inline helper scripts from lib/bindings so they work wherever the page is
+    # opened from, followed by any generated setup code
+    blocks = []
+    for script in scripts:
+        if script.endswith(".js"):
+            with open(script, "r") as f:
+                script = f.read()
+        blocks.append('<script type="text/javascript">\n' + script + "\n</script>")
+    return html.replace("</body>", "\n".join(blocks) + "\n</body>")
+
+
+def page_nodes(nodes):
+    # Track nodes are held back from the page when they can be loaded later, by
+    # tile when loading progressively or from the subgraph routes when serving
+    if PROGRESSIVE_LOADING or SERVING:
+        return ~nodes.type_mask("track")
+    return np.ones(len(nodes), dtype=bool)
+
+
+def visualize_network(nodes, edges, positions=None):
+    positions = positions if PROGRESSIVE_LOADING else None
+    tile_index = None
+    if PROGRESSIVE_LOADING:
+        tile_index = write_tiles(nodes, edges, positions)
+    shown = page_nodes(nodes)
+    shown_edges = shown[edges.source] & shown[edges.target]
 
     # Create a network visualization
-    print("Converting NetworkX to PyVis...") if VERBOSE else None
-    N = Network(
-        "1000px",
-        "1000px",
+    print("Creating PyVis network...") if VERBOSE else None
+    N = TableNetwork(
+        f"{CANVAS_SIZE}px",
+        f"{CANVAS_SIZE}px",
         notebook=False,
         directed=False,
         bgcolor=PALETTE.mocha.colors.mantle.hex,
         font_color=PALETTE.mocha.colors.text.hex,
     )
-    N.from_nx(G)
+
+    # Hand the template JSON serialized straight from the tables, rather than
+    # going through networkx and a dict per node and edge
+    print("Serializing nodes and edges...") if VERBOSE else None
+    N.set_records(
+        node_records_json(nodes, np.flatnonzero(shown), positions),
+        edge_records_json(edges, np.flatnonzero(shown_edges)),
+        int(shown.sum()),
+    )
+    N.options.nodes = {"shape": "dot", "font": {"color": PALETTE.mocha.colors.text.hex}}
 
     # Configure the network physics
     print("Configuring visualization...") if VERBOSE else None
     N.barnes_hut(spring_strength=0.15)
     N.repulsion()
 
+    # A precomputed layout must stay put while tiles are added around it
+    if PROGRESSIVE_LOADING:
+        N.toggle_physics(False)
+
     # Configure the network visualization
     N.show_buttons(filter_=True)
 
@@ -439,22 +2285,38 @@ def visualize_network(nodes, edges):
     print("Saving network visualization to file...") if VERBOSE else None
     N.save_graph(OUTPUT_PATH + "network.html")
 
+    # Add the delta and tile loaders to the saved page
+    scripts = ["lib/bindings/delta.js"]
+    if SERVING:
+        scripts.append("lib/bindings/subgraph.js")
+        scripts.append('listenForGraphDeltas("/events", true);')
+        scripts.append("initSubgraphExpansion();")
+    if WRITE_TIMELINE:
+        scripts += ["lib/bindings/timeline.js", 'loadTimeline("timeline.js");']
+    if PREVIEW_NODES and _preview_sampling is not None:
+        scripts.append(f"var previewSampling = {json.dumps(_preview_sampling)};")
+    if tile_index is not None:
+        scripts += [
+            "lib/bindings/tiles.js",
+            f"initTileLoading({json.dumps(tile_index)});",
+        ]
+    with open(OUTPUT_PATH + "network.html", "r") as f:
+        html = f.read()
+    with open(OUTPUT_PATH + "network.html", "w") as f:
+        f.write(inject_scripts(html, scripts))
+
     # Show visualization
     if SHOW_VISUALIZATION:
         print("Displaying network visualization in browser...") if VERBOSE else None
-        N.show(OUTPUT_PATH + "network.html", notebook=False)
+        webbrowser.open(OUTPUT_PATH + "network.html")
 
 
-def main():
-    print("\nPlease wait while the visualization is created...")
-
-    try:
-        print("\nLoading data...")
-        data = load_data_from_csv()
-        print("Data loaded successfully.")
-    except Exception as e:
-        print(f"Error loading data: {repr(e)}")
-        return
+def build_network(data):
+    # Run every stage after loading, returning the nodes and edges or None on error
+    user_rows = data["user"].value_counts()
+    if PREVIEW_NODES:
+        data = preview_rows(data)
+    read_rows = data["user"].value_counts()
 
     try:
         print("\nCleaning data...")
@@ -462,31 +2324,568 @@ def main():
         print("Data cleaned successfully.")
     except Exception as e:
         print(f"Error cleaning data: {repr(e)}")
-        return
+        return None
+
+    if PREVIEW_NODES:
+        try:
+            print("\nSampling preview...")
+            cleaned_data = sample_preview(cleaned_data, user_rows, read_rows)
+            print("Preview sampled successfully.")
+        except Exception as e:
+            print(f"Error sampling preview: {repr(e)}")
+            return None
+
+    return build_outputs(cleaned_data)
+
 
+def build_network_from_cleaned(frames):
+    # Run every stage after clean_rows, given each export's cleaned rows
     try:
-        print("\nPreparing nodes and edges...")
-        nodes, edges = create_nodes_and_edges(cleaned_data)
-        print("Nodes and edges prepared successfully.")
+        print("\nCombining cleaned data...")
+        cleaned_data = combine_cleaned(frames)
+        write_entries_without_genre(cleaned_data)
+        print("Cleaned data combined successfully.")
     except Exception as e:
-        print(f"Error preparing nodes and edges: {repr(e)}")
-        return
+        print(f"Error combining cleaned data: {repr(e)}")
+        return None
+
+    return build_outputs(cleaned_data)
+
+
+def build_outputs(cleaned_data, tables=None):
+    # Every stage after cleaning, given the tables if they were aggregated already
+    result = build_tables(cleaned_data, tables)
+    if result is None:
+        return None
+    nodes, edges = result
+
+    # One layout shared by every output that places nodes
+    positions = None
+    if needs_layout(cleaned_data):
+        try:
+            print("\nComputing layout...")
+            positions = compute_layout(nodes, edges)
+            print("Layout computed successfully.")
+        except Exception as e:
+            print(f"Error computing layout: {repr(e)}")
+            return None
+
+    if WRITE_GRAPH_DELTA:
+        try:
+            print("\nWriting graph delta...")
+            write_graph_delta(nodes, edges)
+            print("Graph delta written successfully.")
+        except Exception as e:
+            print(f"Error writing graph delta: {repr(e)}")
+            return None
+
+    if EXPORT_GRAPH:
+        try:
+            print("\nExporting graph...")
+            export_graph(nodes, edges, positions)
+            print("Graph exported successfully.")
+        except Exception as e:
+            print(f"Error exporting graph: {repr(e)}")
+            return None
+
+    if WRITE_TIMELINE:
+        try:
+            print("\nWriting timeline...")
+            write_timeline(nodes, edges, cleaned_data, positions)
+            print("Timeline written successfully.")
+        except Exception as e:
+            print(f"Error writing timeline: {repr(e)}")
+            return None
+
+    if WRITE_SNAPSHOT:
+        try:
+            print("\nDrawing snapshot...")
+            write_snapshot(nodes, edges, positions)
+            print("Snapshot drawn successfully.")
+        except Exception as e:
+            print(f"Error drawing snapshot: {repr(e)}")
+            return None
 
     try:
         print("\nCreating network visualization...")
-        visualize_network(nodes, edges)
+        visualize_network(nodes, edges, positions)
         print("Network visualization created successfully.")
     except Exception as e:
         print(f"Error creating network visualization: {repr(e)}")
+        return None
+
+    return nodes, edges
+
+
+def build_tables(cleaned_data, tables=None):
+    # Node and edge building plus the optional stages that annotate the tables
+    try:
+        print("\nPreparing nodes and edges...")
+        nodes, edges = create_nodes_and_edges(cleaned_data, tables)
+        print("Nodes and edges prepared successfully.")
+    except Exception as e:
+        print(f"Error preparing nodes and edges: {repr(e)}")
+        return None
+
+    if DETECT_COMMUNITIES:
+        try:
+            print("\nDetecting communities...")
+            nodes = detect_communities(nodes, edges)
+            print("Communities detected successfully.")
+        except Exception as e:
+            print(f"Error detecting communities: {repr(e)}")
+            return None
+
+    if SIZE_BY_CENTRALITY:
+        try:
+            print("\nSizing nodes by centrality...")
+            nodes = size_nodes_by_centrality(nodes, edges)
+            print("Nodes sized successfully.")
+        except Exception as e:
+            print(f"Error sizing nodes: {repr(e)}")
+            return None
+
+    if PRUNE_EDGES:
+        try:
+            print("\nExtracting edge backbone...")
+            edges = extract_backbone(nodes, edges)
+            print("Edge backbone extracted successfully.")
+        except Exception as e:
+            print(f"Error extracting edge backbone: {repr(e)}")
+            return None
+
+    return nodes, edges
+
+
+async def clean_exports_async(filenames):
+    # Read exports one at a time and clean each as soon as it has been read.
+    # The queue between the stages is bounded, so reading pauses whenever the
+    # cleaners fall behind instead of holding every raw export in memory.
+    raw = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    cleaned = [None] * len(filenames)
+
+    async def read():
+        for position, filename in enumerate(filenames):
+            frame = await asyncio.to_thread(load_data_file, filename)
+            await raw.put((position, frame))
+        for _ in range(PIPELINE_WORKERS):
+            await raw.put(None)
+
+    async def clean():
+        while (item := await raw.get()) is not None:
+            position, frame = item
+            cleaned[position] = await asyncio.to_thread(clean_rows, frame)
+
+    await asyncio.gather(read(), *[clean() for _ in range(PIPELINE_WORKERS)])
+
+    # Combine in file order so the result does not depend on scheduling
+    return await asyncio.to_thread(combine_cleaned, cleaned)
+
+
+async def run_stage_async(message, function, *args):
+    # Run one blocking stage in a worker thread, returning False on error
+    try:
+        await asyncio.to_thread(function, *args)
+        return True
+    except Exception as e:
+        print(f"Error {message}: {repr(e)}")
+        return False
+
+
+async def main_async():
+    # Same stages as main(), but loading overlaps cleaning, and files are written
+    # while later stages are still running
+    print("\nPlease wait while the visualization is created...")
+
+    try:
+        print("\nLoading and cleaning data...")
+        cleaned_data = await clean_exports_async(os.listdir(DATA_PATH))
+        print("Data loaded and cleaned successfully.")
+    except Exception as e:
+        print(f"Error loading and cleaning data: {repr(e)}")
+        return
+
+    # Nothing downstream reads this file, so it is written alongside table building
+    unknown_entries = asyncio.create_task(
+        run_stage_async(
+            "writing entries without genre", write_entries_without_genre, cleaned_data
+        )
+    )
+    result = await asyncio.to_thread(build_tables, cleaned_data)
+    if result is None:
+        await unknown_entries
         return
 
+    # One layout shared by every output that places nodes
+    positions = None
+    if needs_layout(cleaned_data):
+        try:
+            print("\nComputing layout...")
+            positions = await asyncio.to_thread(compute_layout, *result)
+            print("Layout computed successfully.")
+        except Exception as e:
+            print(f"Error computing layout: {repr(e)}")
+            await unknown_entries
+            return
+
+    # The outputs only read the finished tables
+    print("\nWriting outputs...")
+    stages = [unknown_entries]
+    if WRITE_GRAPH_DELTA:
+        stages.append(run_stage_async("writing graph delta", write_graph_delta, *result))
+    if EXPORT_GRAPH:
+        stages.append(
+            run_stage_async("exporting graph", export_graph, *result, positions)
+        )
+    if WRITE_SNAPSHOT:
+        stages.append(
+            run_stage_async("drawing snapshot", write_snapshot, *result, positions)
+        )
+    if WRITE_TIMELINE:
+        stages.append(
+            run_stage_async(
+                "writing timeline", write_timeline, *result, cleaned_data, positions
+            )
+        )
+    stages.append(
+        run_stage_async(
+            "creating network visualization", visualize_network, *result, positions
+        )
+    )
+    if not all(await asyncio.gather(*stages)):
+        return
+    print("Outputs written successfully.")
+
     print("\nProgram complete.")
 
 
+def main():
+    print("\nPlease wait while the visualization is created...")
+
+    # Previews only clean a sample, which the pandas backend does fastest
+    if DATA_BACKEND == "duckdb" and not PREVIEW_NODES:
+        try:
+            print("\nLoading and cleaning data with DuckDB...")
+            cleaned_data, tables = load_and_clean_duckdb()
+            write_entries_without_genre(cleaned_data)
+            print("Data loaded and cleaned successfully.")
+        except Exception as e:
+            print(f"Error loading and cleaning data: {repr(e)}")
+            return
+
+        if build_outputs(cleaned_data, tables) is None:
+            return
+    else:
+        try:
+            print("\nLoading data...")
+            data = load_data_from_csv()
+            print("Data loaded successfully.")
+        except Exception as e:
+            print(f"Error loading data: {repr(e)}")
+            return
+
+        if build_network(data) is None:
+            return
+
+    print("\nProgram complete.")
+
+
+# ---------------------------- Watch Mode ----------------------------
+
+
+class GraphRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Serves the output and the vendored scripts (out/ and lib/) from the project
+    # folder, streams graph deltas to open pages as server-sent events on /events
+    # and answers subgraph queries:
+    #   /ego/<node>?depth=2, /user/<name>, /genre/<name>, /category/<name>
+    # plus cache and latency figures on /stats
+    served_folders = (OUTPUT_PATH.strip("/"), "lib")
+    clients = []
+    clients_lock = threading.Lock()
+    index = None
+    latencies = {}
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        route, _, name = url.path.strip("/").partition("/")
+        if url.path == "/events":
+            return self.stream_events()
+        if url.path == "/stats":
+            return self.send_json(json.dumps(self.stats()))
+        if route not in ("ego", "user", "genre", "category") or not name:
+            return super().do_GET()
+
+        start = time.perf_counter()
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            depth = int(query.get("depth", ["1"])[0])
+        except ValueError:
+            return self.send_error(400, "depth must be a number")
+        if not 1 <= depth <= SUBGRAPH_MAX_DEPTH:
+            return self.send_error(
+                400, f"depth must be between 1 and {SUBGRAPH_MAX_DEPTH}"
+            )
+        if self.index is None:
+            return self.send_error(503, "The graph is still being built")
+
+        node_type = None if route == "ego" else route
+        body = self.index.query(urllib.parse.unquote(name), depth, node_type)
+        if body is None:
+            return self.send_error(404, "No such " + (node_type or "node"))
+        self.latencies.setdefault(route, collections.deque(maxlen=1000)).append(
+            time.perf_counter() - start
+        )
+        self.send_json(body)
+
+    def send_head(self):
+        # Keep the raw exports, the mapping and the caches next to them private
+        path = posixpath.normpath(
+            urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        )
+        if path.lstrip("/").split("/")[0] not in self.served_folders:
+            self.send_error(404)
+            return None
+        return super().send_head()
+
+    def send_json(self, body):
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stats(self):
+        stats = {"routes": {}}
+        for route, samples in list(self.latencies.items()):
+            samples = np.array(samples) * 1000
+            stats["routes"][route] = {
+                "requests": len(samples),
+                "p50_ms": round(float(np.percentile(samples, 50)), 3),
+                "p95_ms": round(float(np.percentile(samples, 95)), 3),
+                "max_ms": round(float(samples.max()), 3),
+            }
+        if self.index is not None:
+            cache = self.index.query.cache_info()
+            stats["nodes"] = len(self.index.nodes)
+            stats["edges"] = len(self.index.edges)
+            stats["cache"] = {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "size": cache.currsize,
+            }
+        return stats
+
+    def stream_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        messages = queue.Queue()
+        with self.clients_lock:
+            self.clients.append(messages)
+        try:
+            while True:
+                try:
+                    message = "event: delta\ndata: " + messages.get(timeout=15)
+                except queue.Empty:
+                    message = ": keepalive"
+                self.wfile.write((message + "\n\n").encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self.clients_lock:
+                self.clients.remove(messages)
+
+    def log_message(self, format, *args):
+        print("Server: " + format % args) if VERBOSE else None
+
+    @classmethod
+    def broadcast(cls, message):
+        with cls.clients_lock:
+            for messages in cls.clients:
+                messages.put(message)
+
+
+def source_mtimes():
+    # Modification times of every export and of the genre mapping, in either form
+    mtimes = {
+        path: os.path.getmtime(path)
+        for path in [MAPPING_PATH, MAPPING_DB_PATH]
+        if os.path.exists(path)
+    }
+    for filename in os.listdir(DATA_PATH):
+        mtimes[filename] = os.path.getmtime(DATA_PATH + filename)
+    return mtimes
+
+
+def reload_genre_mapping():
+    # Import an edited JSON mapping, recompile if the store's version moved on,
+    # and start the resolver over with an empty cache
+    global _mapping_store, _genre_resolver
+    previous_store = _mapping_store
+    _mapping_store = _genre_resolver = None
+    load_genre_resolver()
+    if previous_store is not None:
+        previous_store.close()
+
+
+def watch(serve=False, port=SERVE_PORT):
+    # Rebuild whenever an export or the genre mapping changes. Only changed
+    # exports are read and cleaned again, and the mapping is only recompiled when
+    # it changes, which makes every cleaned export stale.
+    global SHOW_VISUALIZATION, WRITE_GRAPH_DELTA, SERVING
+
+    url = f"http://127.0.0.1:{port}/" + OUTPUT_PATH + "network.html"
+    open_browser = SHOW_VISUALIZATION
+    if serve:
+        # Open pages are patched with deltas instead of being reloaded
+        SHOW_VISUALIZATION = False
+        WRITE_GRAPH_DELTA = True
+        SERVING = True
+        handler = functools.partial(GraphRequestHandler, directory=os.getcwd())
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print("\nServing visualization at " + url)
+
+    if DATA_BACKEND == "duckdb":
+        print(
+            "\nWatch mode only rereads changed exports, so it uses the pandas backend."
+        )
+
+    raw_frames = {}
+    cleaned_frames = {}
+    mtimes = {}
+    print("Watching " + DATA_PATH + " and " + MAPPING_PATH + " for changes...")
+    while True:
+        current = source_mtimes()
+        changed = {
+            name
+            for name in current.keys() | mtimes.keys()
+            if current.get(name) != mtimes.get(name)
+        }
+        mtimes = current
+
+        if changed:
+            start = time.perf_counter()
+            mapping_changed = changed & {MAPPING_PATH, MAPPING_DB_PATH}
+            if mapping_changed and raw_frames:
+                print("\nGenre mapping changed, reloading...")
+                reload_genre_mapping()
+                cleaned_frames.clear()
+                # Importing the JSON writes to the store, which is not another change
+                mtimes = source_mtimes()
+
+            # Signatures cannot be updated in place, so rebuild them from every export.
+            # An export that cannot be read or cleaned, half-written or not a CSV
+            # at all, is left out until it changes again.
+            changed_files = changed - mapping_changed
+            if changed_files:
+                _user_signatures.clear()
+                for filename in changed_files:
+                    raw_frames.pop(filename, None)
+                    cleaned_frames.pop(filename, None)
+                    if filename not in current:
+                        continue
+                    try:
+                        raw_frames[filename] = load_data_file(filename)
+                    except Exception as e:
+                        print(f"Error loading {filename}, skipping it: {repr(e)}")
+                if SHOW_USER_SIMILARITY and USER_SIMILARITY_MODE == "minhash":
+                    for filename, frame in raw_frames.items():
+                        if filename not in changed_files and not frame.empty:
+                            add_user_signatures(frame["user"].iloc[0], frame)
+
+            # Previews sample the raw rows of every export before cleaning, so
+            # they are cleaned from scratch. Otherwise only new exports are.
+            filenames = [name for name in current if name in raw_frames]
+            if PREVIEW_NODES:
+                data = [raw_frames[name] for name in filenames]
+                result = build_network(pd.concat(data)) if data else None
+            else:
+                for filename in filenames:
+                    if filename in cleaned_frames:
+                        continue
+                    try:
+                        print(f"\nCleaning {filename}...") if VERBOSE else None
+                        cleaned_frames[filename] = clean_rows(raw_frames[filename])
+                    except Exception as e:
+                        print(f"Error cleaning {filename}, skipping it: {repr(e)}")
+                        del raw_frames[filename]
+                frames = [
+                    cleaned_frames[name] for name in filenames if name in raw_frames
+                ]
+                result = build_network_from_cleaned(frames) if frames else None
+
+            if result is not None:
+                if serve:
+                    GraphRequestHandler.index = SubgraphIndex(*result)
+                    # There is no delta on the first build without a previous graph
+                    if os.path.exists(OUTPUT_PATH + "network_delta.json"):
+                        with open(OUTPUT_PATH + "network_delta.json", "r") as f:
+                            GraphRequestHandler.broadcast(f.read())
+                elapsed = time.perf_counter() - start
+                print(f"\nRebuilt in {elapsed:.2f}s. Watching for changes...")
+
+            if serve and open_browser:
+                webbrowser.open(url)
+            open_browser = False
+            SHOW_VISUALIZATION = False
+
+        time.sleep(WATCH_INTERVAL)
+
+
 # ---------------------------- Main ----------------------------
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 if __name__ == "__main__":
+    print_header()
+
+    # Load genre mapping once lol
+    try:
+        load_genre_resolver()
+        print("Genre mapping loaded successfully.") if VERBOSE else None
+    except Exception as e:
+        print(f"Error loading genre mapping: {repr(e)}")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Spotify Network Visualization")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="rebuild whenever " + DATA_PATH + " or " + MAPPING_PATH + " change",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="watch, serve the visualization locally and push updates to open pages",
+    )
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="port to serve on")
+    parser.add_argument(
+        "--preview",
+        type=positive_int,
+        default=0,
+        metavar="N",
+        help="cap the graph at N nodes, sampling tracks across users and categories",
+    )
+    args = parser.parse_args()
+    if args.preview:
+        start_preview(args.preview)
+
     try:
-        main()
+        if args.watch or args.serve:
+            watch(serve=args.serve, port=args.port)
+        elif ASYNC_PIPELINE and not PREVIEW_NODES:
+            asyncio.run(main_async())
+        else:
+            main()
     except KeyboardInterrupt:
         print("\nProgram terminated by user.")
         sys.exit(0)
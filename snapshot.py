@@ -0,0 +1,177 @@
+# Headless snapshots of a laid out graph, drawn with NumPy instead of a browser
+# Edges are density shaded: every edge deposits ink along its length, and the
+# accumulated ink is log scaled, so dense regions stay readable at any edge count
+# Used by render_spotify_network.py when WRITE_SNAPSHOT is enabled
+# Run this file directly to benchmark a 4K render of a large random graph
+
+import struct
+import time
+import zlib
+
+import numpy as np
+
+# Defaults
+WIDTH = 3840
+HEIGHT = 2160
+MARGIN = 0.03  # Share of the image left empty around the graph
+SAMPLE_SPACING = 2.0  # Pixels between the points sampled along an edge
+MAX_EDGE_SAMPLES = 32  # Longer edges get fewer, heavier points instead of more
+EDGE_OPACITY = 0.85  # Opacity of the densest edge pixels
+CHUNK_SIZE = 262144  # Edges rasterized at a time
+BACKGROUND = (24, 24, 37)
+
+def fit_positions(positions, width=WIDTH, height=HEIGHT, margin=MARGIN):
+    # Scale and center layout coordinates into pixel coordinates
+    positions = np.asarray(positions, dtype=np.float64)
+    low = positions.min(axis=0)
+    span = np.maximum(positions.max(axis=0) - low, 1e-9)
+    scale = min(width * (1 - 2 * margin) / span[0], height * (1 - 2 * margin) / span[1])
+    offset = (np.array([width, height]) - span * scale) / 2
+    return (positions - low) * scale + offset
+
+def rasterize_edges(xy, sources, targets, edge_rgb, width=WIDTH, height=HEIGHT):
+    # Ink density and ink-weighted color sums per pixel. Each edge is sampled
+    # every SAMPLE_SPACING pixels, up to MAX_EDGE_SAMPLES points, and each point
+    # is weighted by the length of edge it stands for.
+    density = np.zeros(width * height, dtype=np.float64)
+    color = np.zeros((3, width * height), dtype=np.float64)
+    for start in range(0, len(sources), CHUNK_SIZE):
+        first = xy[sources[start:start + CHUNK_SIZE]]
+        delta = xy[targets[start:start + CHUNK_SIZE]] - first
+        lengths = np.hypot(delta[:, 0], delta[:, 1])
+        counts = np.clip(np.ceil(lengths / SAMPLE_SPACING), 2, MAX_EDGE_SAMPLES).astype(np.int64)
+
+        edge = np.repeat(np.arange(len(counts)), counts)
+        step = np.arange(len(edge)) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = step / (counts[edge] - 1)
+        x = (first[edge, 0] + delta[edge, 0] * t).astype(np.int64)
+        y = (first[edge, 1] + delta[edge, 1] * t).astype(np.int64)
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        pixels = y[inside] * width + x[inside]
+        edge = edge[inside]
+
+        # Per edge ink, spread over its samples by bincount
+        ink = np.maximum(lengths, 1) / counts
+        density += np.bincount(pixels, weights=ink[edge], minlength=width * height)
+        rgb = edge_rgb[start:start + CHUNK_SIZE] * ink[:, None]
+        for channel in range(3):
+            color[channel] += np.bincount(
+                pixels, weights=rgb[edge, channel], minlength=width * height
+            )
+    return density, color
+
+def shade(density, color, background=BACKGROUND):
+    # Blend the edge ink over the background with log scaled opacity
+    inked = density > 0
+    image = np.empty((3, len(density)), dtype=np.float64)
+    image[:] = np.asarray(background, dtype=np.float64)[:, None]
+    if inked.any():
+        reference = np.log1p(np.percentile(density[inked], 99))
+        alpha = np.clip(np.log1p(density[inked]) / reference, 0, 1) * EDGE_OPACITY
+        mean = color[:, inked] / density[inked]
+        image[:, inked] = image[:, inked] * (1 - alpha) + mean * alpha
+    return image
+
+def stamp_nodes(image, xy, node_rgb, radii, width=WIDTH, height=HEIGHT):
+    # Draw nodes as filled discs, in the order given so later nodes end up on top
+    radii = np.maximum(np.round(radii).astype(np.int64), 1)
+    centers = np.round(xy).astype(np.int64)
+    pixels = []
+    colors = []
+    for radius in np.unique(radii):
+        members = np.flatnonzero(radii == radius)
+        dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        disc = dx ** 2 + dy ** 2 <= radius ** 2
+        x = centers[members, 0][:, None] + dx[disc][None, :]
+        y = centers[members, 1][:, None] + dy[disc][None, :]
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        pixels.append((y * width + x)[inside])
+        colors.append(np.broadcast_to(members[:, None], x.shape)[inside])
+
+    # Sort the stamps by node so overlapping discs keep the drawing order
+    pixels = np.concatenate(pixels)
+    owners = np.concatenate(colors)
+    order = np.argsort(owners, kind='stable')
+    image[:, pixels[order]] = node_rgb[owners[order]].T.astype(np.float64)
+
+def write_png(path, image):
+    # Minimal truecolor PNG encoder: one unfiltered scanline per row, zlib compressed
+    height, width, _ = image.shape
+    scanlines = np.hstack([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)])
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+def render_png(path, positions, node_rgb, radii, sources, targets, edge_rgb,
+               width=WIDTH, height=HEIGHT, background=BACKGROUND):
+    xy = fit_positions(positions, width, height)
+    density, color = rasterize_edges(xy, sources, targets, edge_rgb, width, height)
+    image = shade(density, color, background)
+    stamp_nodes(image, xy, node_rgb, radii, width, height)
+    pixels = np.clip(np.round(image), 0, 255).astype(np.uint8)
+    write_png(path, pixels.T.reshape(height, width, 3))
+
+def hex_colors(rgb):
+    return ['#%02x%02x%02x' % tuple(color) for color in np.asarray(rgb, dtype=np.uint8).tolist()]
+
+def render_svg(path, positions, node_rgb, radii, sources, targets, edge_rgb,
+               width=WIDTH, height=HEIGHT, background=BACKGROUND):
+    # Edges are grouped by color into one path each, which keeps large graphs small
+    xy = np.round(fit_positions(positions, width, height), 1)
+    edge_colors, edge_codes = np.unique(np.asarray(edge_rgb, dtype=np.uint8), axis=0, return_inverse=True)
+    edge_codes = edge_codes.ravel()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}"'
+                f' viewBox="0 0 {width} {height}">\n')
+        f.write(f'<rect width="100%" height="100%" fill="{hex_colors([background])[0]}"/>\n')
+        f.write('<g fill="none" stroke-width="0.6" stroke-opacity="0.35">\n')
+        for code, stroke in enumerate(hex_colors(edge_colors)):
+            members = np.flatnonzero(edge_codes == code)
+            f.write(f'<path stroke="{stroke}" d="')
+            for start in range(0, len(members), CHUNK_SIZE):
+                chunk = members[start:start + CHUNK_SIZE]
+                first = xy[sources[chunk]].tolist()
+                second = xy[targets[chunk]].tolist()
+                f.write(''.join(f'M{a[0]:g} {a[1]:g}L{b[0]:g} {b[1]:g}' for a, b in zip(first, second)))
+            f.write('"/>\n')
+        f.write('</g>\n<g>\n')
+        fills = hex_colors(node_rgb)
+        for (x, y), radius, fill in zip(xy.tolist(), np.maximum(radii, 1).tolist(), fills):
+            f.write(f'<circle cx="{x:g}" cy="{y:g}" r="{radius:g}" fill="{fill}"/>\n')
+        f.write('</g>\n</svg>\n')
+
+def benchmark(nodes=100000, edges=1000000, path='out/snapshot_benchmark.png'):
+    # Clustered random graph: nodes scattered around cluster centers, edges mostly
+    # within a cluster
+    rng = np.random.default_rng(42)
+    clusters = rng.normal(size=(40, 2)) * 10
+    membership = rng.integers(0, len(clusters), size=nodes)
+    positions = clusters[membership] + rng.normal(size=(nodes, 2))
+    sources = rng.integers(0, nodes, size=edges)
+    order = np.argsort(membership, kind='stable')
+    starts = np.searchsorted(membership[order], membership[sources])
+    sizes = np.bincount(membership, minlength=len(clusters))[membership[sources]]
+    targets = order[starts + (rng.random(edges) * sizes).astype(np.int64)]
+    far = rng.random(edges) < 0.05
+    targets[far] = rng.integers(0, nodes, size=int(far.sum()))
+
+    palette = rng.integers(80, 256, size=(len(clusters), 3))
+    node_rgb = palette[membership]
+    edge_rgb = palette[membership[sources]]
+    radii = rng.choice([2, 2, 2, 4, 8], size=nodes)
+
+    start = time.perf_counter()
+    render_png(path, positions, node_rgb, radii, sources, targets, edge_rgb)
+    print(f'{nodes} nodes, {edges} edges: {WIDTH}x{HEIGHT} PNG in {time.perf_counter() - start:.2f}s')
+
+def main():
+    benchmark()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+# The scripts read their settings and the genre mapping relative to the project
+# folder when they are imported, so the tests import them from there
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,33 @@
+import render_spotify_network as network
+
+
+def user_genre_graph():
+    nodes = network.NodeTable(network.Palette())
+    nodes.add(["user0", "user1"], ["user0", "user1"], "user", "#000000", 30)
+    nodes.add(["rock", "jazz", "pop"], ["rock", "jazz", "pop"], "genre", "#111111", 20)
+    edges = network.EdgeTable(nodes)
+    edges.add(
+        ["user0", "user0", "user0", "user1", "user1"],
+        ["rock", "jazz", "pop", "rock", "pop"],
+        "#888888",
+        [50.0, 1.0, 1.0, 1.0, 40.0],
+    )
+    return nodes, edges
+
+
+def test_backbone_keeps_the_heaviest_edges(monkeypatch):
+    monkeypatch.setattr(network, "BACKBONE_ALPHA", 0)
+    monkeypatch.setattr(network, "BACKBONE_TOP_K", 1)
+    edges = network.extract_backbone(*user_genre_graph())
+    # Each user's and each genre's heaviest edge survives
+    assert sorted(edges.keys(range(len(edges)))) == [
+        "jazz|user0",
+        "pop|user1",
+        "rock|user0",
+    ]
+
+
+def test_backbone_is_quiet_unless_verbose(monkeypatch, capsys):
+    monkeypatch.setattr(network, "VERBOSE", False)
+    network.extract_backbone(*user_genre_graph())
+    assert capsys.readouterr().out == ""
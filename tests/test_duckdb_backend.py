@@ -0,0 +1,32 @@
+import pytest
+
+import render_spotify_network as network
+
+duckdb_backend = pytest.importorskip("duckdb_backend")
+
+HEADER = "Spotify ID,Artist IDs,Track Name,Album Name,Artist Name(s),Release Date,Duration (ms),Popularity,Added By,Added At,Genres\n"
+EXPORTS = {
+    "alice_liked_songs.csv": [
+        'sp01,ar1,One,Alb,A1,2020-01-01,1000,50,,2024-01-01T10:00:00Z,"hip hop,gangster rap"\n',
+        'sp02,ar2,Two,Alb,A2,2020-01-01,1000,50,,2024-02-01T10:00:00Z,"indie rock,dream pop,shoegaze"\n',
+        "sp03,ar3,Three,Alb,A3,2020-01-01,1000,50,,2024-03-01T10:00:00Z,\n",
+        'sp04,ar4,Four,Alb,A4,2020-01-01,1000,50,,2024-04-01T10:00:00Z,"made up genre,jazz"\n',
+    ],
+    "bob_liked_songs.csv": [
+        'sp02,ar2,Two,Alb,A2,2020-01-01,1000,50,,2024-01-05T10:00:00Z,"indie rock,dream pop,shoegaze"\n',
+        'sp05,ar5,Five,Alb,A5,2020-01-01,1000,50,,2024-01-06T10:00:00Z,"east coast hip hop,hip hop"\n',
+        'sp06,ar1,Six,Alb,A1,2020-01-01,1000,50,,2024-01-07T10:00:00Z,"gangster rap"\n',
+    ],
+}
+
+
+def test_backends_build_the_same_graph(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    for filename, rows in EXPORTS.items():
+        (data / filename).write_text(HEADER + "".join(rows))
+    monkeypatch.setattr(network, "DATA_PATH", str(data) + "/")
+    monkeypatch.setattr(network, "OUTPUT_PATH", str(tmp_path) + "/")
+    monkeypatch.setattr(network, "VERBOSE", False)
+
+    assert duckdb_backend.check_parity(str(tmp_path / "duckdb_tmp")), "backends differ"
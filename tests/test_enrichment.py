@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import genre_enrichment
+import render_spotify_network as network
+
+
+class FakeClient:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def fetch(self, artist_ids):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {artist_id: ["genre " + artist_id] for artist_id in artist_ids}
+
+
+@pytest.fixture
+def exports():
+    return pd.DataFrame(
+        {
+            "Spotify ID": ["t1", "t2"],
+            "Genres": ["rock", np.nan],
+            "Artist IDs": ["a1", "a2,a3"],
+        }
+    )
+
+
+@pytest.fixture
+def use_client(tmp_path, monkeypatch):
+    def use(client):
+        cache = genre_enrichment.GenreCache(str(tmp_path / "artist_genres.json"))
+        monkeypatch.setattr(network, "_enrichment_client", lambda: (client, cache))
+
+    return use
+
+
+def test_fills_in_missing_genres(exports, use_client):
+    use_client(FakeClient())
+    enriched = network.enrich_missing_genres(exports)
+    assert enriched["Genres"].tolist() == ["rock", "genre a2,genre a3"]
+
+
+def test_failed_lookup_keeps_rows_without_genres(exports, use_client, capsys):
+    client = FakeClient(RuntimeError("Artist lookup failed with HTTP 401"))
+    use_client(client)
+    enriched = network.enrich_missing_genres(exports)
+
+    assert client.calls == 1
+    assert enriched["Genres"].isna().tolist() == [False, True]
+    assert "Warning: Looking up genres failed" in capsys.readouterr().out
+
+
+def test_missing_token_skips_the_lookup(exports, monkeypatch, capsys):
+    monkeypatch.delenv(genre_enrichment.TOKEN_VARIABLE, raising=False)
+    monkeypatch.setattr(network, "ENRICHMENT_API_URL", genre_enrichment.API_URL)
+    network._enrichment_client.cache_clear()
+    try:
+        enriched = network.enrich_missing_genres(exports)
+        assert network._enrichment_client() is None
+    finally:
+        network._enrichment_client.cache_clear()
+
+    assert enriched["Genres"].isna().tolist() == [False, True]
+    assert capsys.readouterr().out.count("SPOTIFY_TOKEN is not set") == 1
@@ -0,0 +1,82 @@
+import json
+
+import pandas as pd
+import pytest
+
+import genre_resolution
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    mapping = {
+        'dutch hip hop': 'Miscellaneous',
+        "women's music": 'Pop & Indie',
+        'bebop': 'Jazz & Blues',
+        'synthwave': 'Electronic & Dance',
+        'dream pop': 'Electronic & Dance',
+    }
+    json_path = tmp_path / 'genre_mapping.json'
+    json_path.write_text(json.dumps(mapping))
+    store = genre_resolution.open_mapping_store(str(tmp_path / 'genre_mapping.db'), str(json_path))
+    store.add_alias('bop', 'bebop')
+    compiled = genre_resolution.compile_mapping(store, str(tmp_path / 'genre_mapping.pkl'))
+    yield genre_resolution.GenreResolver(compiled, store)
+    store.close()
+
+
+@pytest.mark.parametrize('genre, tier, category', [
+    ('dutch hip hop', 'exact', 'Miscellaneous'),
+    ('bop', 'exact', 'Jazz & Blues'),
+    ('Womens  Music', 'normalized', 'Pop & Indie'),
+    ('belgian hip hop', 'suffix', 'Miscellaneous'),
+    ('post-rock', 'suffix', 'Rock & Metal'),
+    ('k-pop', 'suffix', 'Pop & Indie'),
+    ('indie', 'suffix', 'Pop & Indie'),
+    ('synthwav', 'fuzzy', 'Electronic & Dance'),
+    ('zzz unheard of', 'unknown', 'Unknown'),
+    ('!!!', 'unknown', 'Unknown'),
+])
+def test_match_tiers(resolver, genre, tier, category):
+    assert resolver.match(genre) == (tier, category)
+
+
+def test_mapped_genres_win_over_keyword_rules(resolver):
+    # "dream pop" is mapped itself, so its hyphenated spelling finds it before the "pop" rule
+    assert resolver.match('dream-pop') == ('suffix', 'Electronic & Dance')
+    assert resolver.match('swedish dream pop') == ('suffix', 'Electronic & Dance')
+    assert resolver.match('swedish pop') == ('suffix', 'Pop & Indie')
+
+
+def test_alias_follows_its_genre(resolver):
+    resolver.store.set_many({'bebop': 'Miscellaneous'})
+    assert resolver.store.lookup(['bop']) == {'bop': 'Miscellaneous'}
+
+
+def test_compiled_artifact_is_rebuilt_for_an_old_format(tmp_path, resolver):
+    artifact = tmp_path / 'genre_mapping.pkl'
+    compiled = genre_resolution.load_compiled_mapping(resolver.store, str(artifact))
+    assert compiled['format'] == genre_resolution.COMPILED_FORMAT
+
+    compiled['format'] = 0
+    genre_resolution.pickle.dump(compiled, artifact.open('wb'))
+    assert genre_resolution.load_compiled_mapping(resolver.store, str(artifact))['format'] == genre_resolution.COMPILED_FORMAT
+
+
+def test_coverage_counts_distinct_tracks():
+    # The same two tracks liked by two users, so four rows but two tracks
+    data = pd.DataFrame({
+        'Spotify ID': ['a', 'b', 'a', 'b', 'c'],
+        'Genres': ['nu gaze,shoegaze', "['nu gaze']", 'nu gaze,shoegaze', 'nu gaze', None],
+        'user': ['ann', 'ann', 'bo', 'bo', 'bo'],
+    })
+    rows = genre_resolution.genre_rows(data)
+    assert rows[['Spotify ID', 'Genre', 'Position']].values.tolist() == [
+        ['a', 'nu gaze', 0], ['a', 'shoegaze', 1], ['b', 'nu gaze', 0],
+        ['a', 'nu gaze', 0], ['a', 'shoegaze', 1], ['b', 'nu gaze', 0],
+    ]
+
+    coverage = genre_resolution.coverage_counts(rows)
+    assert coverage.to_dict('index') == {
+        'nu gaze': {'tracks': 2, 'users': 2, 'primary_tracks': 2},
+        'shoegaze': {'tracks': 1, 'users': 2, 'primary_tracks': 0},
+    }
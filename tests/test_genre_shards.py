@@ -0,0 +1,18 @@
+import numpy as np
+
+import genre_shards
+
+
+def test_shard_splits_its_rows():
+    values = ["rock,indie rock", "", "jazz,,bebop", "pop"]
+    memory = genre_shards.share_strings(values)
+    try:
+        rows, codes, uniques = genre_shards.split_genre_shard(
+            memory.name, len(values), np.array([0, 1, 2])
+        )
+    finally:
+        memory.close()
+        memory.unlink()
+
+    assert rows.tolist() == [0, 0, 2, 2]
+    assert uniques[codes].tolist() == ["rock", "indie rock", "jazz", "bebop"]
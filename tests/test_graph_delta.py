@@ -0,0 +1,110 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import render_spotify_network as network
+
+DELTA_JS = "lib/bindings/delta.js"
+
+
+def graph(tracks, track_color="#ffffff"):
+    nodes = network.NodeTable(network.Palette())
+    nodes.add(["user0"], ["user0"], "user", "#000000", 30)
+    nodes.add(tracks, tracks, "track", track_color, 10)
+    edges = network.EdgeTable(nodes)
+    edges.add(["user0"] * len(tracks), tracks, "#888888", 2.0)
+    return nodes, edges
+
+
+def page_records(nodes, edges):
+    # What the page holds for a graph: vis node and edge records keyed by id
+    return (
+        {
+            node["id"]: node
+            for node in json.loads(network.node_records_json(nodes, range(len(nodes))))
+        },
+        {
+            edge["id"]: edge
+            for edge in json.loads(network.edge_records_json(edges, range(len(edges))))
+        },
+    )
+
+
+@pytest.fixture
+def delta(tmp_path, monkeypatch):
+    # Delta from a first run to a second one that adds, removes and recolors tracks
+    monkeypatch.setattr(network, "OUTPUT_PATH", str(tmp_path) + "/")
+    network.write_graph_delta(*graph(["a", "b", "c"]))
+    assert not (tmp_path / "network_delta.json").exists()
+
+    network.write_graph_delta(*graph(["b", "c", "d"], track_color="#ff0000"))
+    return json.loads((tmp_path / "network_delta.json").read_text())
+
+
+def test_delta_lists_each_change(delta):
+    assert delta["nodes"]["remove"] == ["a"]
+    assert [node["id"] for node in delta["nodes"]["add"]] == ["d"]
+    assert sorted(node["id"] for node in delta["nodes"]["update"]) == ["b", "c"]
+    assert delta["edges"]["remove"] == ["a|user0"]
+
+
+def test_delta_round_trip(delta):
+    # Applying the delta the way delta.js does turns the first graph into the second
+    page_nodes, page_edges = page_records(*graph(["a", "b", "c"]))
+    for records, part in ((page_nodes, delta["nodes"]), (page_edges, delta["edges"])):
+        for key in part["remove"]:
+            del records[key]
+        for record in part["add"] + part["update"]:
+            records.setdefault(record["id"], {}).update(record)
+
+    assert (page_nodes, page_edges) == page_records(
+        *graph(["b", "c", "d"], track_color="#ff0000")
+    )
+
+
+def run_delta_js(page, delta, loaded_only=False):
+    # Run applyGraphDelta from delta.js against minimal stand-ins for vis DataSets
+    script = """
+    class DataSet {
+      constructor(items) { this.items = items; }
+      remove(ids) { ids.forEach((id) => delete this.items[id]); }
+      update(items) { items.forEach((item) => { this.items[item.id] = Object.assign(this.items[item.id] || {}, item); }); }
+      get() { return this.items; }
+    }
+    var [nodeItems, edgeItems, delta, loadedOnly] = JSON.parse(require("fs").readFileSync(0, "utf8"));
+    var nodes = new DataSet(nodeItems), edges = new DataSet(edgeItems);
+    var nodeColors = {}, allNodes = {}, allEdges = {};
+    eval(require("fs").readFileSync(process.argv[1], "utf8"));
+    applyGraphDelta(delta, loadedOnly);
+    console.log(JSON.stringify([nodes.items, edges.items]));
+    """
+    result = subprocess.run(
+        ["node", "-e", script, DELTA_JS],
+        input=json.dumps([page[0], page[1], delta, loaded_only]),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return tuple(json.loads(result.stdout))
+
+
+needs_node = pytest.mark.skipif(
+    shutil.which("node") is None, reason="needs node to run delta.js"
+)
+
+
+@needs_node
+def test_delta_js_round_trip(delta):
+    assert run_delta_js(page_records(*graph(["a", "b", "c"])), delta) == page_records(
+        *graph(["b", "c", "d"], track_color="#ff0000")
+    )
+
+
+@needs_node
+def test_delta_js_seed_page(delta):
+    # A served page that has only loaded track b keeps to it and skips the rest
+    page = page_records(*graph(["b"]))
+    after = page_records(*graph(["b"], track_color="#ff0000"))
+    assert run_delta_js(page, delta, loaded_only=True) == after
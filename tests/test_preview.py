@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import render_spotify_network as network
+
+
+@pytest.mark.parametrize(
+    "sizes, budget, expected",
+    [
+        ([50, 30, 20], 10, [5, 3, 2]),
+        ([1, 1, 98], 10, [1, 1, 8]),
+        ([10, 10, 10], 10, [4, 3, 3]),
+        ([5, 3], 100, [5, 3]),
+        ([40, 30, 20, 10], 2, [1, 1, 0, 0]),
+    ],
+)
+def test_allocate_quotas(sizes, budget, expected):
+    quotas = network.allocate_quotas(sizes, budget)
+    assert quotas.tolist() == expected
+    assert quotas.sum() == min(budget, sum(sizes))
+    assert (quotas <= np.array(sizes)).all()
+
+
+def test_preview_keeps_out_of_the_full_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(network, "OUTPUT_PATH", str(tmp_path) + "/")
+    monkeypatch.setattr(network, "PREVIEW_OUTPUT_PATH", str(tmp_path / "preview") + "/")
+    monkeypatch.setattr(network, "PREVIEW_NODES", 0)
+    network.start_preview(100)
+
+    assert network.PREVIEW_NODES == 100
+    nodes = network.NodeTable(network.Palette())
+    nodes.add(["user0"], ["user0"], "user", "#000000", 30)
+    network.write_graph_delta(nodes, network.EdgeTable(nodes))
+    assert [path.name for path in tmp_path.iterdir()] == ["preview"]
+    assert (tmp_path / "preview" / "graph_state.pkl").exists()
@@ -0,0 +1,72 @@
+import functools
+import http.client
+import http.server
+import json
+import os
+import threading
+
+import pytest
+
+import render_spotify_network as network
+
+
+@pytest.fixture
+def server():
+    handler = functools.partial(network.GraphRequestHandler, directory=os.getcwd())
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def status(server, path):
+    connection = http.client.HTTPConnection(*server.server_address)
+    connection.request("GET", path)
+    code = connection.getresponse().status
+    connection.close()
+    return code
+
+
+def test_serves_vendored_scripts(server):
+    assert status(server, "/lib/bindings/delta.js") == 200
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/",
+        "/genre_mapping.json",
+        "/genre_mapping.db",
+        "/requests.jsonl",
+        "/lib/../genre_mapping.json",
+        "/out/%2e%2e/genre_mapping.json",
+    ],
+)
+def test_keeps_the_project_folder_private(server, path):
+    assert status(server, path) == 404
+
+
+def test_served_page_holds_back_tracks(monkeypatch):
+    nodes = network.NodeTable(network.Palette())
+    nodes.add(["user0"], ["user0"], "user", "#000000", 30)
+    nodes.add(["rock"], ["rock"], "genre", "#111111", 20)
+    nodes.add(["a", "b"], ["a", "b"], "track", "#ffffff", 10)
+    assert network.page_nodes(nodes).all()
+
+    monkeypatch.setattr(network, "SERVING", True)
+    assert network.page_nodes(nodes).tolist() == [True, True, False, False]
+
+
+def test_user_route_returns_the_users_tracks():
+    nodes = network.NodeTable(network.Palette())
+    nodes.add(["user0", "user1"], ["user0", "user1"], "user", "#000000", 30)
+    nodes.add(["a", "b", "c"], ["a", "b", "c"], "track", "#ffffff", 10)
+    edges = network.EdgeTable(nodes)
+    edges.add(["user0", "user0", "user1"], ["a", "b", "c"], "#888888")
+    index = network.SubgraphIndex(nodes, edges)
+
+    subgraph = json.loads(index.query("user0", 1, "user"))
+    assert sorted(node["id"] for node in subgraph["nodes"]) == ["a", "b", "user0"]
+    assert sorted(edge["id"] for edge in subgraph["edges"]) == ["a|user0", "b|user0"]
+    assert index.query("a", 1, "user") is None
@@ -0,0 +1,68 @@
+import numpy as np
+
+import render_spotify_network as network
+
+
+def track_graph(tracks=3000, genres=8):
+    # Two users and a few genres, with every track on one user and one genre
+    nodes = network.NodeTable(network.Palette())
+    nodes.add(["user0", "user1"], ["user0", "user1"], "user", "#ffffff", 30)
+    genre_ids = [f"genre{i}" for i in range(genres)]
+    nodes.add(genre_ids, genre_ids, "genre", "#ffffff", 20)
+    track_ids = [f"track{i}" for i in range(tracks)]
+    nodes.add(track_ids, track_ids, "track", "#ffffff", 10)
+
+    edges = network.EdgeTable(nodes)
+    edges.add(["user0", "user1"] * (tracks // 2), track_ids, "#ffffff")
+    edges.add(track_ids, [genre_ids[i % genres] for i in range(tracks)], "#ffffff")
+    edges.add(["user0"] * genres, genre_ids, "#ffffff")
+    return nodes, edges
+
+
+def test_quadtree_tiles_cover_every_point_within_capacity():
+    points = np.random.default_rng(0).normal(scale=100, size=(5000, 2))
+    points[:3000] *= 0.01  # a dense cluster that has to be split further
+
+    tiles = network.quadtree_tiles(points, 400)
+
+    rows = np.concatenate([rows for _, _, rows in tiles])
+    assert sorted(rows.tolist()) == list(range(len(points)))
+    for _, (x0, y0, x1, y1), rows in tiles:
+        assert len(rows) <= 400
+        inside = points[rows]
+        assert (inside[:, 0] >= x0).all() and (inside[:, 0] <= x1).all()
+        assert (inside[:, 1] >= y0).all() and (inside[:, 1] <= y1).all()
+
+
+def test_quadtree_tiles_stop_splitting_coincident_points():
+    tiles = network.quadtree_tiles(np.zeros((50, 2)), 10)
+    assert len(tiles) == 1 and len(tiles[0][2]) == 50
+
+
+def test_layout_spreads_tracks_around_their_genres():
+    nodes, edges = track_graph()
+    positions = network.compute_layout(nodes, edges)
+    track = nodes.type_mask("track")
+
+    # Tracks do not pile up on a few points
+    assert len(np.unique(positions[track].round(1), axis=0)) == track.sum()
+
+    # Each genre's tracks sit on a spiral around it that grows with their number
+    genre = nodes.rows(["genre0"])[0]
+    own = nodes.rows([f"track{i}" for i in range(0, 3000, 8)])
+    distance = np.hypot(*(positions[own] - positions[genre]).T)
+    assert distance.max() <= network.TRACK_SPACING * np.sqrt(len(own) + 1) + 1e-6
+
+
+def test_tile_index_holds_back_tracks_at_the_opening_view(tmp_path, monkeypatch):
+    monkeypatch.setattr(network, "OUTPUT_PATH", str(tmp_path) + "/")
+    monkeypatch.setattr(network, "TILE_CAPACITY", 200)
+    nodes, edges = track_graph()
+    positions = network.compute_layout(nodes, edges)
+
+    index = network.write_tiles(nodes, edges, positions)
+
+    assert len(index["tiles"]) == len(list((tmp_path / "tiles").glob("tile_*.js")))
+    skeleton = positions[~nodes.type_mask("track")]
+    fit_scale = min(network.CANVAS_SIZE / np.ptp(skeleton, axis=0).max(), 1.0)
+    assert index["minScale"] > fit_scale